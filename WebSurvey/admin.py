@@ -3,7 +3,7 @@ from django.contrib.auth.admin import UserAdmin
 from .models import (
     User, Section, Survey, Question, MultipleChoiceOption,
     TrueFalseAnswer, EnumerationAnswer, QuestionContext,
-    StudentResponse, QuestionAnswer
+    StudentResponse, QuestionAnswer, AnswerCount, ExportJob, StudentImportJob
 )
 
 # Register your models here.
@@ -82,3 +82,22 @@ class QuestionAnswerAdmin(admin.ModelAdmin):
     list_filter = ['is_correct']
     search_fields = ['response__student__username', 'question__question_text']
 
+
+@admin.register(AnswerCount)
+class AnswerCountAdmin(admin.ModelAdmin):
+    list_display = ['survey', 'question', 'selected_option', 'true_false_answer', 'count']
+    list_filter = ['survey']
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'teacher', 'status', 'progress', 'total', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['teacher__username']
+
+
+@admin.register(StudentImportJob)
+class StudentImportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'teacher', 'section', 'status', 'progress', 'total', 'created', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['teacher__username', 'section__name']
@@ -0,0 +1,280 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import AnswerCount, QuestionAnswer, Survey
+
+CHOICE_TYPES = ('multiple_choice', 'likert')
+TEXT_TYPES = ('essay', 'enumeration')
+
+ESSAY_STOP_WORDS = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+    'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
+    'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those',
+}
+ENUMERATION_STOP_WORDS = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+}
+
+def get_analytics_version(survey_id):
+    """Token that changes whenever a survey's analytics may have changed.
+
+    Built from the survey's revision and ``updated_at`` (question edits) and
+    its submitted-response total in AnswerCount (submissions and deletions),
+    so every process derives the same token from the database in one query.
+    Returns None if the survey does not exist.
+    """
+    total = AnswerCount.objects.filter(survey=OuterRef('pk'), question__isnull=True).values('count')[:1]
+    row = (
+        Survey.objects.filter(id=survey_id)
+        .annotate(total=Coalesce(Subquery(total), 0))
+        .values_list('revision', 'updated_at', 'total')
+        .order_by()
+        .first()
+    )
+    if row is None:
+        return None
+    revision, updated_at, total = row
+    return f'{revision}-{updated_at.timestamp():.6f}-{total}'
+
+
+def _submitted_answers(survey):
+    return QuestionAnswer.objects.filter(response__survey=survey, response__is_submitted=True)
+
+
+def _answer_count_rows(response):
+    """Counter rows touched by one response: its survey total plus one per answer."""
+    rows = [AnswerCount(survey_id=response.survey_id)]
+    answers = response.answers.values_list('question_id', 'selected_option_id', 'true_false_answer')
+    for question_id, option_id, true_false in answers:
+        if option_id is not None:
+            rows.append(AnswerCount(survey_id=response.survey_id, question_id=question_id, selected_option_id=option_id))
+        elif true_false is not None:
+            rows.append(AnswerCount(survey_id=response.survey_id, question_id=question_id, true_false_answer=true_false))
+    return rows
+
+
+def _answer_count_filter(rows):
+    """Match the counter rows of one survey named by ``rows`` (its total when a row has no question)."""
+    survey_id = rows[0].survey_id
+    option_ids = [row.selected_option_id for row in rows if row.selected_option_id is not None]
+    true_ids = [row.question_id for row in rows if row.true_false_answer is True]
+    false_ids = [row.question_id for row in rows if row.true_false_answer is False]
+    condition = (
+        Q(selected_option_id__in=option_ids)
+        | Q(question_id__in=true_ids, true_false_answer=True)
+        | Q(question_id__in=false_ids, true_false_answer=False)
+    )
+    if any(row.question_id is None for row in rows):
+        condition |= Q(question__isnull=True)
+    return Q(survey_id=survey_id) & condition
+
+
+def record_submission(response):
+    """Add a newly submitted response to the survey's answer counters.
+
+    Call inside the transaction that flips ``is_submitted`` to True.
+    """
+    rows = _answer_count_rows(response)
+    with transaction.atomic():
+        AnswerCount.objects.bulk_create(rows, ignore_conflicts=True)
+        AnswerCount.objects.filter(_answer_count_filter(rows)).update(count=F('count') + 1)
+
+
+def retract_submission(response):
+    """Remove a previously submitted response from the answer counters."""
+    rows = _answer_count_rows(response)
+    AnswerCount.objects.filter(_answer_count_filter(rows), count__gt=0).update(count=F('count') - 1)
+
+
+def retract_submissions(responses):
+    """Remove many submitted responses (a StudentResponse queryset) from the answer counters.
+
+    Reads the answers grouped by counter row and then runs one UPDATE per
+    survey and decrement size, so the cost does not grow with the number of
+    responses.
+    """
+    groups = defaultdict(list)
+    totals = responses.values_list('survey_id').annotate(total=Count('id')).order_by()
+    for survey_id, total in totals:
+        groups[survey_id, total].append(AnswerCount(survey_id=survey_id))
+    answers = (
+        QuestionAnswer.objects.filter(response__in=responses)
+        .filter(Q(selected_option__isnull=False) | Q(true_false_answer__isnull=False))
+        .values_list('response__survey_id', 'question_id', 'selected_option_id', 'true_false_answer')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for survey_id, question_id, option_id, true_false, total in answers:
+        groups[survey_id, total].append(AnswerCount(
+            survey_id=survey_id,
+            question_id=question_id,
+            selected_option_id=option_id,
+            true_false_answer=true_false if option_id is None else None,
+        ))
+    for (survey_id, total), rows in groups.items():
+        AnswerCount.objects.filter(_answer_count_filter(rows)).update(count=Greatest(F('count') - total, 0))
+
+
+def rebuild_answer_counts(surveys=None):
+    """Recompute answer counters from QuestionAnswer rows.
+
+    ``surveys`` is an optional Survey queryset; all surveys are rebuilt if omitted.
+    """
+    counters = AnswerCount.objects.all()
+    responses = QuestionAnswer.objects.filter(response__is_submitted=True)
+    if surveys is not None:
+        counters = counters.filter(survey__in=surveys)
+        responses = responses.filter(response__survey__in=surveys)
+
+    rows = []
+    totals = (
+        responses.values('response__survey_id')
+        .annotate(total=Count('response_id', distinct=True))
+        .order_by()
+    )
+    for row in totals:
+        rows.append(AnswerCount(survey_id=row['response__survey_id'], count=row['total']))
+
+    grouped = (
+        responses.filter(Q(selected_option__isnull=False) | Q(true_false_answer__isnull=False))
+        .values('response__survey_id', 'question_id', 'selected_option_id', 'true_false_answer')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for row in grouped:
+        counter = AnswerCount(
+            survey_id=row['response__survey_id'],
+            question_id=row['question_id'],
+            count=row['total'],
+        )
+        if row['selected_option_id'] is not None:
+            counter.selected_option_id = row['selected_option_id']
+        else:
+            counter.true_false_answer = row['true_false_answer']
+        rows.append(counter)
+
+    with transaction.atomic():
+        counters.delete()
+        AnswerCount.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def get_answer_distribution(survey):
+    """Read the answer counters for a survey.
+
+    Returns ``(option_counts, true_false_counts, total_responses)`` where
+    ``option_counts`` maps ``question_id -> {option_id: count}`` and
+    ``true_false_counts`` maps ``question_id -> {True: count, False: count}``.
+    One query, proportional to the number of questions rather than responses.
+    """
+    option_counts = defaultdict(dict)
+    true_false_counts = defaultdict(dict)
+    total_responses = 0
+    rows = AnswerCount.objects.filter(survey=survey).values_list(
+        'question_id', 'selected_option_id', 'true_false_answer', 'count'
+    )
+    for question_id, option_id, true_false, count in rows:
+        if question_id is None:
+            total_responses = count
+        elif option_id is not None:
+            option_counts[question_id][option_id] = count
+        elif true_false is not None:
+            true_false_counts[question_id][true_false] = count
+    return option_counts, true_false_counts, total_responses
+
+
+def get_text_answers(survey, question_ids):
+    """Return ``question_id -> [text answers]`` for the given questions in one query."""
+    text_answers = defaultdict(list)
+    if not question_ids:
+        return text_answers
+    rows = (
+        _submitted_answers(survey)
+        .filter(question_id__in=question_ids)
+        .exclude(text_answer='')
+        .values_list('question_id', 'text_answer')
+    )
+    for question_id, text in rows:
+        text_answers[question_id].append(text)
+    return text_answers
+
+
+def build_word_cloud(text_answers, stop_words):
+    """Top 50 words across the answers, in the shape the word cloud chart expects."""
+    words = ' '.join(text_answers).lower().split()
+    words = [w for w in words if w not in stop_words and len(w) > 1]
+    top_words = Counter(words).most_common(50)
+    return {
+        'words': [{'text': word, 'size': count} for word, count in top_words],
+        'total_responses': len(text_answers),
+    }
+
+
+def build_charts_data(questions, option_counts, true_false_counts, text_answers):
+    """Assemble the ``charts_data`` list rendered by survey_analytics.html.
+
+    ``questions`` must have ``options`` prefetched.
+    """
+    charts_data = []
+    for question in questions:
+        chart_info = {
+            'question_text': question.question_text,
+            'type': question.question_type,
+            'data': {}
+        }
+
+        if question.question_type in CHOICE_TYPES:
+            counts = option_counts.get(question.id, {})
+            labels = []
+            values = []
+            for option in question.options.all():
+                labels.append(option.option_text)
+                values.append(counts.get(option.id, 0))
+
+            if sum(values) > 0:
+                chart_info['data'] = {
+                    'labels': labels,
+                    'values': values
+                }
+
+        elif question.question_type == 'true_false':
+            counts = true_false_counts.get(question.id, {})
+            true_count = counts.get(True, 0)
+            false_count = counts.get(False, 0)
+
+            if true_count + false_count > 0:
+                chart_info['data'] = {
+                    'labels': ['True', 'False'],
+                    'values': [true_count, false_count]
+                }
+
+        elif question.question_type in TEXT_TYPES:
+            answers = text_answers.get(question.id)
+            if answers:
+                stop_words = ESSAY_STOP_WORDS if question.question_type == 'essay' else ENUMERATION_STOP_WORDS
+                chart_info['data'] = build_word_cloud(answers, stop_words)
+
+        if chart_info['data']:
+            charts_data.append(chart_info)
+    return charts_data
+
+
+def get_survey_analytics(survey):
+    """Compute chart data for every question of a survey.
+
+    Option and true/false counts come from the AnswerCount table, so this runs
+    a fixed number of queries regardless of how many questions, options or
+    responses the survey has. Returns ``(charts_data, total_responses)``.
+    """
+    questions = list(survey.questions.prefetch_related('options'))
+    option_counts, true_false_counts, total_responses = get_answer_distribution(survey)
+    text_answers = get_text_answers(
+        survey, [q.id for q in questions if q.question_type in TEXT_TYPES]
+    )
+    charts_data = build_charts_data(questions, option_counts, true_false_counts, text_answers)
+    return charts_data, total_responses
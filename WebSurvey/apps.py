@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class WebsurveyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'WebSurvey'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,99 @@
+import base64
+import binascii
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+
+# Only raster formats are stored; SVG could carry script when opened directly.
+BLOB_CONTENT_TYPES = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+EXTENSION_CONTENT_TYPES = {ext: content_type for content_type, ext in BLOB_CONTENT_TYPES.items()}
+# <sha256>.<ext> for originals, <sha256>-<width>w.<ext> for resized variants
+BLOB_NAME_RE = re.compile(r'^(?P<digest>[0-9a-f]{64})(?:-(?P<width>\d+)w)?\.(?P<ext>png|jpg|gif|webp)$')
+DATA_URL_RE = re.compile(r'^data:(?P<content_type>[\w.+-]+/[\w.+-]+);base64,(?P<data>.*)$', re.DOTALL)
+MAX_BLOB_SIZE = 5 * 1024 * 1024
+
+
+def get_blob_storage():
+    return FileSystemStorage(location=settings.MEDIA_ROOT / 'blobs')
+
+
+def _blob_path(name):
+    # Shard by the first two hex digits to keep directories small
+    return f'{name[:2]}/{name}'
+
+
+def store_blob(data, content_type):
+    """Save ``data`` under its SHA-256 digest and return the blob name.
+
+    Identical content is stored once; saving it again is a no-op.
+    """
+    ext = BLOB_CONTENT_TYPES.get(content_type)
+    if ext is None:
+        raise ValueError(f'Unsupported content type: {content_type}')
+    if len(data) > MAX_BLOB_SIZE:
+        raise ValueError('File is too large')
+    name = f'{hashlib.sha256(data).hexdigest()}.{ext}'
+    write_blob(name, data)
+    return name
+
+
+def write_blob(name, data):
+    """Store ``data`` under an explicit blob name unless it already exists."""
+    storage = get_blob_storage()
+    path = _blob_path(name)
+    if not storage.exists(path):
+        storage.save(path, ContentFile(data))
+
+
+def blob_exists(name):
+    return get_blob_storage().exists(_blob_path(name))
+
+
+def blob_name_from_url(url):
+    """Inverse of ``blob_url``; returns None for anything that is not a blob URL."""
+    prefix = reverse('blob', args=['_'])[:-1]
+    if not url or not url.startswith(prefix):
+        return None
+    name = url[len(prefix):]
+    return name if BLOB_NAME_RE.match(name) else None
+
+
+def open_blob(name):
+    """Open a stored blob for reading; raises FileNotFoundError if it is missing."""
+    if not BLOB_NAME_RE.match(name):
+        raise FileNotFoundError(name)
+    return get_blob_storage().open(_blob_path(name), 'rb')
+
+
+def blob_url(name):
+    return reverse('blob', args=[name])
+
+
+def blob_content_type(name):
+    match = BLOB_NAME_RE.match(name)
+    return EXTENSION_CONTENT_TYPES[match.group('ext')] if match else None
+
+
+def decode_data_url(content):
+    """Split a base64 ``data:`` image URL into ``(data, content_type)``.
+
+    Returns None if ``content`` is not a supported data URL (already stored,
+    malformed, or an unsupported type).
+    """
+    match = DATA_URL_RE.match(content or '')
+    if not match or match.group('content_type') not in BLOB_CONTENT_TYPES:
+        return None
+    try:
+        data = base64.b64decode(match.group('data'), validate=False)
+    except (binascii.Error, ValueError):
+        return None
+    return data, match.group('content_type')
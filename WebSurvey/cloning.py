@@ -0,0 +1,104 @@
+from django.db import transaction
+
+from .models import (
+    Survey,
+    Question,
+    MultipleChoiceOption,
+    TrueFalseAnswer,
+    EnumerationAnswer,
+    QuestionContext,
+)
+from .serializers import load_survey_tree
+
+
+def clone_survey(survey, teacher, sections=None):
+    """Copy ``survey`` (questions, options, answer keys and context; no responses).
+
+    The copies are always drafts. Without ``sections`` a single copy is made
+    that keeps the original's section assignments. With a list of sections one
+    copy is made per section and assigned only to it. Every table is written
+    with one ``bulk_create`` regardless of how many copies or questions there
+    are. Returns the list of new surveys.
+    """
+    questions = load_survey_tree(survey)
+    total_points = sum(q.points for q in questions)
+
+    if sections is None:
+        targets = [(f'{survey.title} (Copy)', list(survey.sections.all()))]
+    else:
+        targets = [(f'{survey.title} ({section.name})', [section]) for section in sections]
+
+    with transaction.atomic():
+        new_surveys = Survey.objects.bulk_create([
+            Survey(
+                teacher=teacher,
+                title=title,
+                description=survey.description,
+                status='draft',  # Always set as draft
+                due_date=survey.due_date,
+                time_limit=survey.time_limit,
+                total_points=total_points,
+            )
+            for title, _ in targets
+        ])
+
+        Through = Survey.sections.through
+        Through.objects.bulk_create([
+            Through(survey_id=new_survey.id, section_id=section.id)
+            for new_survey, (_, target_sections) in zip(new_surveys, targets)
+            for section in target_sections
+        ])
+
+        new_questions = Question.objects.bulk_create([
+            Question(
+                survey=new_survey,
+                question_text=question.question_text,
+                question_type=question.question_type,
+                required=question.required,
+                points=question.points,
+                order=question.order,
+            )
+            for new_survey in new_surveys
+            for question in questions
+        ])
+
+        options = []
+        enumeration_answers = []
+        true_false_answers = []
+        context_items = []
+        # new_questions is laid out survey by survey in the same question order
+        for index, new_question in enumerate(new_questions):
+            question = questions[index % len(questions)]
+            for option in question.options.all():
+                options.append(MultipleChoiceOption(
+                    question=new_question,
+                    option_text=option.option_text,
+                    is_correct=option.is_correct,
+                    order=option.order,
+                ))
+            for answer in question.enumeration_answers.all():
+                enumeration_answers.append(EnumerationAnswer(
+                    question=new_question,
+                    answer_text=answer.answer_text,
+                    order=answer.order,
+                ))
+            if hasattr(question, 'true_false_answer'):
+                true_false_answers.append(TrueFalseAnswer(
+                    question=new_question,
+                    is_true=question.true_false_answer.is_true,
+                ))
+            for context in question.context_items.all():
+                context_items.append(QuestionContext(
+                    question=new_question,
+                    context_type=context.context_type,
+                    content=context.content,
+                    language=context.language,
+                    order=context.order,
+                ))
+
+        MultipleChoiceOption.objects.bulk_create(options)
+        EnumerationAnswer.objects.bulk_create(enumeration_answers)
+        TrueFalseAnswer.objects.bulk_create(true_false_answers)
+        QuestionContext.objects.bulk_create(context_items)
+
+    return new_surveys
@@ -0,0 +1,155 @@
+"""Background export jobs: a zip archive with one CSV per survey plus a manifest.
+
+Jobs are rows of ``ExportJob``. Views enqueue them and poll their status;
+``manage.py run_export_worker`` claims pending jobs and builds the archives
+in a local process pool, writing them under ``MEDIA_ROOT/exports``.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import zipfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .exports import EXPORT_CHUNK_SIZE, csv_safe_row, iter_export_rows
+from .models import ExportJob, StudentResponse, Survey
+
+logger = logging.getLogger(__name__)
+
+
+def get_export_storage():
+    return FileSystemStorage(location=settings.MEDIA_ROOT / 'exports')
+
+
+def enqueue_export(teacher, survey_ids=None):
+    """Queue an export of the given surveys (all of the teacher's if empty).
+
+    An identical export that is still pending or running is reused.
+    """
+    survey_ids = sorted(set(survey_ids or []))
+    job = ExportJob.objects.filter(
+        teacher=teacher, survey_ids=survey_ids, status__in=['pending', 'running']
+    ).first()
+    return job or ExportJob.objects.create(teacher=teacher, survey_ids=survey_ids)
+
+
+def claim_next_job(model=ExportJob):
+    """Mark the oldest pending job as running and return its id, or None if the queue is empty.
+
+    ``model`` is the job table to claim from (``ExportJob`` or
+    ``StudentImportJob``). The conditional UPDATE makes sure two workers
+    never claim the same job.
+    """
+    while True:
+        job_id = (
+            model.objects.filter(status='pending')
+            .order_by('created_at', 'id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        if model.objects.filter(id=job_id, status='pending').update(status='running', started_at=timezone.now()):
+            return job_id
+
+
+def requeue_running_jobs(model=ExportJob):
+    """Put jobs left running by a worker that died back in the queue."""
+    return model.objects.filter(status='running').update(status='pending', progress=0, started_at=None)
+
+
+def _job_surveys(job):
+    surveys = Survey.objects.filter(teacher=job.teacher_id)
+    if job.survey_ids:
+        surveys = surveys.filter(id__in=job.survey_ids)
+    return list(surveys.order_by('id'))
+
+
+def _write_survey_csv(archive, name, job, survey, progress):
+    """Write one survey's CSV into the archive and return how many responses it holds."""
+    rows = 0
+    with archive.open(name, 'w', force_zip64=True) as raw:
+        with io.TextIOWrapper(raw, encoding='utf-8-sig', newline='') as text:
+            writer = csv.writer(text)
+            for index, row in enumerate(iter_export_rows(job.teacher, survey)):
+                writer.writerow(csv_safe_row(row))
+                if index == 0:
+                    continue
+                rows += 1
+                if rows % EXPORT_CHUNK_SIZE == 0:
+                    ExportJob.objects.filter(id=job.id).update(progress=progress + rows)
+    return rows
+
+
+def build_export_archive(job):
+    """Write the job's archive to export storage and return its file name."""
+    storage = get_export_storage()
+    surveys = _job_surveys(job)
+    job.total = StudentResponse.objects.filter(survey__in=surveys, is_submitted=True).count()
+    ExportJob.objects.filter(id=job.id).update(total=job.total)
+
+    file_name = f'export-{job.id}.zip'
+    path = storage.path(file_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial_path = f'{path}.part'
+
+    manifest = {
+        'job_id': job.id,
+        'teacher': job.teacher.username,
+        'generated_at': timezone.now().isoformat(),
+        'surveys': [],
+    }
+    progress = 0
+    with zipfile.ZipFile(partial_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for survey in surveys:
+            name = f'{survey.id}-{slugify(survey.title) or "survey"}.csv'
+            rows = _write_survey_csv(archive, name, job, survey, progress)
+            progress += rows
+            ExportJob.objects.filter(id=job.id).update(progress=progress)
+            manifest['surveys'].append({
+                'id': survey.id,
+                'title': survey.title,
+                'status': survey.status,
+                'file': name,
+                'responses': rows,
+            })
+        archive.writestr('manifest.json', json.dumps(manifest, indent=2))
+    # Only a finished archive ever appears under the final name
+    os.replace(partial_path, path)
+    return file_name
+
+
+def run_export_job(job_id):
+    """Build the archive of a claimed job and record the outcome. Runs in a worker process."""
+    job = ExportJob.objects.select_related('teacher').get(id=job_id)
+    try:
+        file_name = build_export_archive(job)
+    except Exception as e:
+        logger.exception(f"Export job {job_id} failed")
+        ExportJob.objects.filter(id=job_id).update(status='failed', error=str(e), finished_at=timezone.now())
+        return 'failed'
+    ExportJob.objects.filter(id=job_id).update(
+        status='done', file_name=file_name, progress=job.total, finished_at=timezone.now()
+    )
+    return 'done'
+
+
+def job_status(job):
+    """Plain-data status of a job (a dict from ``ExportJob.objects.values()``) for the polling endpoint."""
+    data = {
+        'id': job['id'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'total': job['total'],
+    }
+    if job['status'] == 'done':
+        data['download_url'] = reverse('download_export_job', args=[job['id']])
+    elif job['status'] == 'failed':
+        data['error'] = job['error']
+    return data
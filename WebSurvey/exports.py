@@ -0,0 +1,233 @@
+"""Streaming CSV and XLSX exports of submitted responses.
+
+One row per ``StudentResponse`` and one column per ``Question``. Responses and
+answers are read as two ``iterator(chunk_size=...)`` streams ordered by
+response id and merged as they go, so memory use does not grow with the
+number of responses and the first bytes go out before the last row is read.
+"""
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import Question, QuestionAnswer, StudentResponse
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+RESPONSE_COLUMNS = ['Response ID', 'Survey', 'Username', 'Student', 'Section', 'Submitted At', 'Score']
+# Hand the compressed workbook to the client once this much has built up
+XLSX_FLUSH_SIZE = 64 * 1024
+XLSX_MAX_CELL_LENGTH = 32767
+# Spreadsheet apps run a CSV cell starting with one of these as a formula
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+_XML_ILLEGAL_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Responses" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+_SHEET_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_FOOTER = '</sheetData></worksheet>'
+
+
+def export_filename(teacher, survey=None, export_format='csv'):
+    name = slugify(survey.title) if survey else slugify(teacher.username)
+    return f'{name or "survey"}-responses.{export_format}'
+
+
+def _export_questions(teacher, survey):
+    questions = Question.objects.filter(survey__teacher=teacher)
+    if survey is not None:
+        questions = questions.filter(survey=survey)
+    return list(questions.select_related('survey').order_by('survey_id', 'order', 'id'))
+
+
+def _answer_value(selected_option_text, true_false_answer, text_answer):
+    if selected_option_text is not None:
+        return selected_option_text
+    if true_false_answer is not None:
+        return 'True' if true_false_answer else 'False'
+    return text_answer
+
+
+def iter_export_rows(teacher, survey=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the header row, then one row per submitted response of ``survey`` (or all the teacher's surveys)."""
+    questions = _export_questions(teacher, survey)
+    if survey is not None:
+        yield RESPONSE_COLUMNS + [question.question_text for question in questions]
+    else:
+        yield RESPONSE_COLUMNS + [f'{question.survey.title}: {question.question_text}' for question in questions]
+    question_ids = [question.id for question in questions]
+
+    responses = StudentResponse.objects.filter(survey__teacher=teacher, is_submitted=True)
+    answers = QuestionAnswer.objects.filter(response__survey__teacher=teacher, response__is_submitted=True)
+    if survey is not None:
+        responses = responses.filter(survey=survey)
+        answers = answers.filter(response__survey=survey)
+    responses = responses.order_by('id').values_list(
+        'id', 'survey__title', 'student__username', 'student__first_name', 'student__last_name',
+        'student__section__name', 'submitted_at', 'score',
+    ).iterator(chunk_size=chunk_size)
+    answers = answers.order_by('response_id').values_list(
+        'response_id', 'question_id', 'selected_option__option_text', 'true_false_answer', 'text_answer',
+    ).iterator(chunk_size=chunk_size)
+
+    pending = next(answers, None)
+    for response_id, title, username, first_name, last_name, section, submitted_at, score in responses:
+        values = {}
+        while pending is not None and pending[0] <= response_id:
+            if pending[0] == response_id:
+                values[pending[1]] = _answer_value(*pending[2:])
+            pending = next(answers, None)
+        yield [
+            response_id,
+            title,
+            username,
+            f'{first_name} {last_name}'.strip(),
+            section or '',
+            timezone.localtime(submitted_at).strftime('%Y-%m-%d %H:%M:%S') if submitted_at else '',
+            score if score is not None else '',
+        ] + [values.get(question_id, '') for question_id in question_ids]
+
+
+class _Echo:
+    """File-like object whose write() hands back the line, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def csv_safe_row(row):
+    """Prefix text cells that a spreadsheet would evaluate as a formula with ``'``.
+
+    Answers, names and titles are typed by students and teachers, so a cell
+    like ``=HYPERLINK(...)`` must open as text. Numbers are left alone.
+    """
+    return [
+        f"'{value}" if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES) else value
+        for value in row
+    ]
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    # The byte order mark makes Excel open the file as UTF-8
+    yield '\ufeff'.encode('utf-8')
+    for row in rows:
+        yield writer.writerow(csv_safe_row(row)).encode('utf-8')
+
+
+class _StreamBuffer:
+    """Write-only, unseekable sink that zipfile writes into and the generator drains."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_row(row_number, values):
+    cells = []
+    for index, value in enumerate(values):
+        if value is None or value == '':
+            continue
+        ref = f'{_column_letter(index)}{row_number}'
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            text = escape(_XML_ILLEGAL_RE.sub('', str(value))[:XLSX_MAX_CELL_LENGTH])
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{row_number}">{"".join(cells)}</row>'
+
+
+def iter_xlsx(rows):
+    """Stream a single-sheet workbook.
+
+    zipfile writes to an unseekable sink with data descriptors, so each
+    compressed chunk can be sent as soon as it is produced. Cells use inline
+    strings to avoid holding a shared string table in memory.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield buffer.drain()
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(_SHEET_HEADER.encode('utf-8'))
+            for row_number, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(row_number, row).encode('utf-8'))
+                if buffer.size >= XLSX_FLUSH_SIZE:
+                    yield buffer.drain()
+            sheet.write(_SHEET_FOOTER.encode('utf-8'))
+    yield buffer.drain()
+
+
+def iter_export(teacher, survey=None, export_format='csv'):
+    """Bytes of the export in ``export_format`` (one of ``EXPORT_FORMATS``), produced incrementally."""
+    rows = iter_export_rows(teacher, survey)
+    if export_format == 'xlsx':
+        return iter_xlsx(rows)
+    return iter_csv(rows)
@@ -0,0 +1,185 @@
+import io
+import json
+import logging
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+
+from . import blobs
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow is optional; without it images are served as uploaded
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Widths of the resized copies generated for each context image
+IMAGE_VARIANT_WIDTHS = (320, 960, 1600)
+MANIFEST_CACHE_KEY = 'websurvey:image_manifest:{digest}'
+MISSING_MANIFEST_TIMEOUT = 300
+# Pillow format names of the image types the blob store accepts
+PIL_FORMAT_CONTENT_TYPES = {
+    'PNG': 'image/png',
+    'JPEG': 'image/jpeg',
+    'MPO': 'image/jpeg',  # how Pillow reports many camera JPEGs
+    'GIF': 'image/gif',
+    'WEBP': 'image/webp',
+}
+# Used instead when Pillow is not installed
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+def _manifest_path(digest):
+    return f'manifests/{digest[:2]}/{digest}.json'
+
+
+def _variant_format(image):
+    """Pick the output format for resized copies: WebP when available."""
+    if features.check('webp'):
+        return 'WEBP', 'webp'
+    if image.mode in ('RGBA', 'LA', 'P'):
+        return 'PNG', 'png'
+    return 'JPEG', 'jpg'
+
+
+def create_image_variants(name):
+    """Generate downscaled copies of a stored image blob and record them.
+
+    Writes a small JSON manifest next to the blobs holding the original width
+    and the variant blob names. Safe to call repeatedly. Returns the manifest,
+    or None if Pillow is not installed or the blob is not a readable image.
+    """
+    if Image is None:
+        return None
+    match = blobs.BLOB_NAME_RE.match(name)
+    if not match or match.group('width'):
+        return None
+    digest = match.group('digest')
+
+    try:
+        with blobs.open_blob(name) as blob_file:
+            image = Image.open(blob_file)
+            image.load()
+    except (FileNotFoundError, OSError) as e:
+        logger.warning(f"Could not read image blob {name}: {e}")
+        return None
+
+    manifest = {'name': name, 'width': image.width, 'height': image.height, 'variants': []}
+    # Animated GIFs would lose their frames, so they are served as uploaded
+    if not getattr(image, 'is_animated', False):
+        image = ImageOps.exif_transpose(image)
+        pil_format, ext = _variant_format(image)
+        if pil_format == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        for width in IMAGE_VARIANT_WIDTHS:
+            if width >= image.width:
+                break
+            height = max(1, round(image.height * width / image.width))
+            buffer = io.BytesIO()
+            image.resize((width, height), Image.LANCZOS).save(buffer, pil_format, quality=82)
+            variant_name = f'{digest}-{width}w.{ext}'
+            blobs.write_blob(variant_name, buffer.getvalue())
+            manifest['variants'].append({'name': variant_name, 'width': width})
+
+    storage = blobs.get_blob_storage()
+    path = _manifest_path(digest)
+    if storage.exists(path):
+        storage.delete(path)
+    storage.save(path, ContentFile(json.dumps(manifest).encode('utf-8')))
+    cache.set(MANIFEST_CACHE_KEY.format(digest=digest), manifest, None)
+    return manifest
+
+
+def get_image_manifest(name):
+    """Return the variant manifest for an image blob, or None if it has none."""
+    match = blobs.BLOB_NAME_RE.match(name or '')
+    if not match:
+        return None
+    digest = match.group('digest')
+    key = MANIFEST_CACHE_KEY.format(digest=digest)
+    manifest = cache.get(key)
+    if manifest is None:
+        try:
+            with blobs.get_blob_storage().open(_manifest_path(digest), 'rb') as manifest_file:
+                manifest = json.loads(manifest_file.read())
+        except (FileNotFoundError, ValueError):
+            manifest = {}
+        # Blobs are immutable, so a manifest can be cached forever; a missing one
+        # is rechecked now and then in case variants were generated elsewhere.
+        cache.set(key, manifest, None if manifest else MISSING_MANIFEST_TIMEOUT)
+    return manifest or None
+
+
+def image_url(content):
+    """URL of a stored context image: blob names become blob URLs, anything else already is a URL."""
+    if blobs.BLOB_NAME_RE.match(content or ''):
+        return blobs.blob_url(content)
+    return content
+
+
+def image_srcset(content):
+    """Build a ``srcset`` attribute value for a stored context image ('' if none)."""
+    manifest = get_image_manifest(content)
+    if not manifest or not manifest['variants']:
+        return ''
+    candidates = [f"{blobs.blob_url(variant['name'])} {variant['width']}w" for variant in manifest['variants']]
+    candidates.append(f"{blobs.blob_url(content)} {manifest['width']}w")
+    return ', '.join(candidates)
+
+
+def detect_image_type(data):
+    """Content type of ``data`` judged from the bytes themselves, or None if it is not a supported image.
+
+    With Pillow the image must decode; without it only the file signature is checked.
+    """
+    if Image is None:
+        if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+            return 'image/webp'
+        return next((content_type for signature, content_type in IMAGE_SIGNATURES if data.startswith(signature)), None)
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+            return PIL_FORMAT_CONTENT_TYPES.get(image.format)
+    except Exception:  # Pillow raises all sorts of errors on corrupt input
+        return None
+
+
+def store_image(data):
+    """Store an uploaded image and generate its resized variants.
+
+    The type is taken from the decoded image rather than from the client.
+    Raises ValueError if ``data`` is not a supported image.
+    """
+    content_type = detect_image_type(data)
+    if content_type is None:
+        raise ValueError('The file is not a supported image')
+    name = blobs.store_blob(data, content_type)
+    create_image_variants(name)
+    return name
+
+
+def context_image_content(content):
+    """Value stored for a context image sent by the builder: a blob name where possible.
+
+    Blob URLs (as ``image_url`` handed them out) go back to their name, and
+    base64 data URLs that decode as images are moved into the blob store with
+    resized variants. URLs are only built at render time, so stored rows never
+    depend on routing.
+    """
+    name = blobs.blob_name_from_url(content)
+    if name is not None:
+        return name
+    decoded = blobs.decode_data_url(content)
+    if decoded is None:
+        return content
+    data, _ = decoded
+    try:
+        return store_image(data)
+    except ValueError:
+        return content
@@ -0,0 +1,94 @@
+"""Per-request SQL and latency measurements with rolling percentiles per view.
+
+``RequestMetricsMiddleware`` feeds ``record_request``; ``metrics_snapshot``
+summarises the samples for the staff-only ``request_metrics`` endpoint.
+Samples live in the memory of each server process, so with several workers
+every process reports only the requests it served.
+"""
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+# Samples kept per view; older ones fall out of the percentiles
+METRICS_WINDOW = 500
+PERCENTILES = (50, 95, 99)
+
+_samples = {}
+_lock = threading.Lock()
+
+
+class QueryTimer:
+    """``connection.execute_wrapper`` that counts queries and their total time."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+def get_query_budget(view_name, method=None):
+    """Most queries ``view_name`` should issue per ``method`` request, or None for no limit.
+
+    Without ``method`` the configured budget is returned as is, which may be
+    a per-method dict.
+    """
+    default = getattr(settings, 'DEFAULT_QUERY_BUDGET', None)
+    budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name, default)
+    if isinstance(budget, dict) and method is not None:
+        return budget.get(method, default)
+    return budget
+
+
+def record_request(view_name, queries, sql_ms, total_ms, response_bytes):
+    with _lock:
+        samples = _samples.get(view_name)
+        if samples is None:
+            samples = _samples[view_name] = deque(maxlen=METRICS_WINDOW)
+        samples.append((queries, round(sql_ms, 2), round(total_ms, 2), response_bytes))
+
+
+def reset_metrics():
+    with _lock:
+        _samples.clear()
+
+
+def _percentiles(values):
+    # Streaming responses have no known size
+    ordered = sorted(value for value in values if value is not None)
+    if not ordered:
+        return None
+    # Nearest-rank percentile
+    return {
+        f'p{percentile}': ordered[max(0, -(-percentile * len(ordered) // 100) - 1)]
+        for percentile in PERCENTILES
+    }
+
+
+def metrics_snapshot():
+    """Per-view request count, query budget and percentiles of each measurement, busiest view first."""
+    with _lock:
+        samples = {view_name: list(values) for view_name, values in _samples.items()}
+
+    views = []
+    for view_name, values in samples.items():
+        queries, sql_ms, total_ms, response_bytes = zip(*values)
+        views.append({
+            'view': view_name,
+            'requests': len(values),
+            'query_budget': get_query_budget(view_name),
+            'queries': _percentiles(queries),
+            'sql_ms': _percentiles(sql_ms),
+            'total_ms': _percentiles(total_ms),
+            'response_bytes': _percentiles(response_bytes),
+        })
+    views.sort(key=lambda view: view['requests'], reverse=True)
+    return views
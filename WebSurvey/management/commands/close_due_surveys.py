@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from WebSurvey.models import Survey
+from WebSurvey.services import auto_close_due_surveys, get_next_due_date
+
+
+class Command(BaseCommand):
+    help = 'Close published surveys whose due date has passed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Keep running and close each survey as soon as its due date passes.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=60,
+            help='Longest time in seconds to sleep between checks in --watch mode (default: 60).',
+        )
+
+    def handle(self, *args, **options):
+        if not options['watch']:
+            self.close_due()
+            return
+
+        interval = max(1, options['interval'])
+        self.stdout.write(f'Watching survey due dates (max interval {interval}s). Press Ctrl+C to stop.')
+        try:
+            while True:
+                self.close_due()
+                time.sleep(self.seconds_until_next_check(interval))
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
+
+    def close_due(self):
+        due_ids = list(
+            Survey.objects.filter(status='published', due_date__lte=timezone.now())
+            .values_list('id', flat=True)
+        )
+        auto_close_due_surveys()
+        if due_ids:
+            self.stdout.write(self.style.SUCCESS(
+                f'Closed {len(due_ids)} survey(s): {", ".join(str(pk) for pk in due_ids)}'
+            ))
+
+    def seconds_until_next_check(self, interval):
+        # Wake up right at the next due date, but re-check at least every
+        # `interval` seconds so newly published surveys are noticed.
+        next_due = get_next_due_date(refresh=True)
+        if next_due is None:
+            return interval
+        remaining = (next_due - timezone.now()).total_seconds()
+        return min(interval, max(remaining, 0.5))
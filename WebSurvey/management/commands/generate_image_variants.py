@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from WebSurvey.blobs import BLOB_NAME_RE
+from WebSurvey.images import Image, create_image_variants, get_image_manifest
+from WebSurvey.models import QuestionContext
+
+
+class Command(BaseCommand):
+    help = 'Generate resized variants for context images that do not have them yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants even for images that already have them.',
+        )
+
+    def handle(self, *args, **options):
+        if Image is None:
+            raise CommandError('Pillow is required to generate image variants.')
+
+        names = (
+            QuestionContext.objects.filter(context_type='image')
+            .values_list('content', flat=True)
+            .distinct()
+        )
+        generated = 0
+        for name in names.iterator():
+            # External image URLs have nothing stored to resize
+            if not BLOB_NAME_RE.match(name):
+                continue
+            if not options['force'] and get_image_manifest(name) is not None:
+                continue
+            if create_image_variants(name) is not None:
+                generated += 1
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {generated} image(s).'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from WebSurvey.models import Section
+from WebSurvey.student_import import import_students, parse_student_csv
+
+
+class Command(BaseCommand):
+    help = 'Create student accounts in a section from a CSV file (username, password, email, first_name, last_name).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Path to the UTF-8 CSV file.')
+        parser.add_argument('--section', type=int, required=True, help='Id of the section to enroll the students in.')
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=None,
+            help='Processes used to hash passwords (default: one per CPU).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            section = Section.objects.get(id=options['section'])
+        except Section.DoesNotExist:
+            raise CommandError(f'Section {options["section"]} does not exist.')
+
+        with open(options['csv_file'], encoding='utf-8-sig') as csv_file:
+            rows, errors = parse_student_csv(csv_file.read())
+        if errors:
+            for error in errors:
+                self.stderr.write(error)
+            raise CommandError('No students were imported.')
+
+        users = import_students(rows, section, options['processes'])
+        self.stdout.write(self.style.SUCCESS(f'Imported {len(users)} student(s) into {section.name}.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from WebSurvey.analytics import rebuild_answer_counts
+from WebSurvey.models import Survey
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the AnswerCount analytics counters from submitted answers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--survey',
+            type=int,
+            action='append',
+            dest='survey_ids',
+            help='Only rebuild counters for this survey id (may be repeated).',
+        )
+
+    def handle(self, *args, **options):
+        surveys = None
+        if options['survey_ids']:
+            surveys = Survey.objects.filter(id__in=options['survey_ids'])
+        rows = rebuild_answer_counts(surveys)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} answer counter row(s).'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from WebSurvey.search import create_search_table, is_search_supported, reindex_responses
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index used by response management.'
+
+    def handle(self, *args, **options):
+        if not is_search_supported():
+            raise CommandError(f'Full-text search is not available on {connection.vendor}.')
+        create_search_table(connection)
+        reindex_responses()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
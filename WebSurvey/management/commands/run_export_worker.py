@@ -0,0 +1,85 @@
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+
+from WebSurvey.export_jobs import claim_next_job, requeue_running_jobs, run_export_job
+from WebSurvey.models import ExportJob, StudentImportJob
+from WebSurvey.student_import import expire_stale_imports, run_import_job
+
+
+class Command(BaseCommand):
+    help = 'Build queued response export archives and run queued student imports in a local process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=2,
+            help='Number of jobs to run at the same time, and of processes hashing an import (default: 2).',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2,
+            help='Seconds to wait between checks for new jobs (default: 2).',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of waiting for new jobs.',
+        )
+
+    def handle(self, *args, **options):
+        processes = max(1, options['processes'])
+        # Run a single worker per site: jobs it finds running were orphaned by a previous worker
+        requeued = requeue_running_jobs(ExportJob) + requeue_running_jobs(StudentImportJob)
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} interrupted job(s).')
+
+        # Spawned children start clean and set Django up before taking a job,
+        # rather than inheriting the parent's database connection.
+        context = multiprocessing.get_context('spawn')
+        self.stdout.write(f'Job worker running with {processes} process(es). Press Ctrl+C to stop.')
+        try:
+            with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=django.setup) as pool:
+                self.work(pool, processes, options['interval'], options['once'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped.')
+
+    def claim(self, pool, processes):
+        """Submit the oldest pending export, or else import; return ``(future, kind, job_id)`` or None if both queues are empty."""
+        job_id = claim_next_job(ExportJob)
+        if job_id is not None:
+            return pool.submit(run_export_job, job_id), 'export', job_id
+        # Imports left waiting too long are failed and their passwords deleted first
+        expire_stale_imports()
+        job_id = claim_next_job(StudentImportJob)
+        if job_id is not None:
+            # Hashing is the slow part; the job spreads it over its own pool
+            return pool.submit(run_import_job, job_id, processes), 'import', job_id
+        return None
+
+    def work(self, pool, processes, interval, once):
+        running = {}
+        while True:
+            while len(running) < processes:
+                claimed = self.claim(pool, processes)
+                if claimed is None:
+                    break
+                future, kind, job_id = claimed
+                self.stdout.write(f'Started {kind} job {job_id}.')
+                running[future] = (kind, job_id)
+
+            if once and not running:
+                return
+
+            done, _ = wait(running, timeout=interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, job_id = running.pop(future)
+                status = future.result()
+                if status == 'done':
+                    self.stdout.write(self.style.SUCCESS(f'{kind.capitalize()} job {job_id} finished.'))
+                else:
+                    self.stdout.write(self.style.ERROR(f'{kind.capitalize()} job {job_id} failed.'))
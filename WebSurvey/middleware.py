@@ -1,13 +1,69 @@
-from .services import auto_close_due_surveys
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .instrumentation import QueryTimer, get_query_budget, record_request
+from .services import close_due_surveys_if_needed
+
+logger = logging.getLogger(__name__)
 
 
 class AutoCloseSurveyMiddleware:
-    """Ensure surveys past their due date are marked closed on every request."""
+    """Ensure surveys past their due date are marked closed on every request.
+
+    The check is a cache lookup against the earliest due date; the database is
+    only queried once that watermark has passed.
+    """
 
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        auto_close_due_surveys()
+        close_due_surveys_if_needed()
         response = self.get_response(request)
         return response
+
+
+class RequestMetricsMiddleware:
+    """Measure SQL query count and time, total latency and response size of each request.
+
+    Results go into the rolling per-view percentiles of ``instrumentation``
+    and a ``Server-Timing`` header. A warning is logged when a view issues
+    more queries than its budget in ``settings.QUERY_BUDGETS``. The header
+    goes to staff, and to everyone else only with ``SERVER_TIMING_HEADER``.
+    Queries run while a streaming response is being consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        sql_ms = timer.duration * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else 'unresolved'
+        response_bytes = None if response.streaming else len(response.content)
+        record_request(view_name, timer.count, sql_ms, total_ms, response_bytes)
+
+        budget = get_query_budget(view_name, request.method)
+        if budget is not None and timer.count > budget:
+            logger.warning(
+                f"{view_name} ran {timer.count} queries (budget {budget}) for {request.method} {request.path}"
+            )
+
+        user = getattr(request, 'user', None)
+        if getattr(settings, 'SERVER_TIMING_HEADER', settings.DEBUG) or getattr(user, 'is_staff', False):
+            response['Server-Timing'] = (
+                f'db;dur={sql_ms:.1f};desc="{timer.count} queries", app;dur={total_ms:.1f}'
+            )
+        return response
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def populate_answer_counts(apps, schema_editor):
+    AnswerCount = apps.get_model('WebSurvey', 'AnswerCount')
+    QuestionAnswer = apps.get_model('WebSurvey', 'QuestionAnswer')
+    answers = QuestionAnswer.objects.filter(response__is_submitted=True)
+
+    rows = []
+    totals = answers.values('response__survey_id').annotate(total=Count('response_id', distinct=True)).order_by()
+    for row in totals:
+        rows.append(AnswerCount(survey_id=row['response__survey_id'], count=row['total']))
+
+    grouped = (
+        answers.filter(Q(selected_option__isnull=False) | Q(true_false_answer__isnull=False))
+        .values('response__survey_id', 'question_id', 'selected_option_id', 'true_false_answer')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for row in grouped:
+        counter = AnswerCount(survey_id=row['response__survey_id'], question_id=row['question_id'], count=row['total'])
+        if row['selected_option_id'] is not None:
+            counter.selected_option_id = row['selected_option_id']
+        else:
+            counter.true_false_answer = row['true_false_answer']
+        rows.append(counter)
+
+    AnswerCount.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WebSurvey', '0007_alter_question_question_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('true_false_answer', models.BooleanField(blank=True, null=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('question', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='answer_counts', to='WebSurvey.question')),
+                ('selected_option', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='answer_counts', to='WebSurvey.multiplechoiceoption')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_counts', to='WebSurvey.survey')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('question__isnull', True)), fields=('survey',), name='unique_survey_response_count'), models.UniqueConstraint(condition=models.Q(('selected_option__isnull', False)), fields=('selected_option',), name='unique_option_answer_count'), models.UniqueConstraint(condition=models.Q(('true_false_answer__isnull', False)), fields=('question', 'true_false_answer'), name='unique_true_false_answer_count')],
+            },
+        ),
+        migrations.RunPython(populate_answer_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WebSurvey', '0008_answercount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='revision',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,60 @@
+import base64
+import binascii
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import migrations
+
+# Frozen copies of the blob store rules at the time of this migration, so it
+# keeps working however WebSurvey.blobs changes later.
+BLOB_CONTENT_TYPES = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+DATA_URL_RE = re.compile(r'^data:(?P<content_type>[\w.+-]+/[\w.+-]+);base64,(?P<data>.*)$', re.DOTALL)
+MAX_BLOB_SIZE = 5 * 1024 * 1024
+
+
+def _store_data_url(storage, content):
+    """Write a base64 image data URL to the blob store and return its blob name, or None."""
+    match = DATA_URL_RE.match(content or '')
+    if not match or match.group('content_type') not in BLOB_CONTENT_TYPES:
+        return None
+    try:
+        data = base64.b64decode(match.group('data'), validate=False)
+    except (binascii.Error, ValueError):
+        return None
+    if len(data) > MAX_BLOB_SIZE:
+        return None
+    name = f'{hashlib.sha256(data).hexdigest()}.{BLOB_CONTENT_TYPES[match.group("content_type")]}'
+    path = f'{name[:2]}/{name}'
+    if not storage.exists(path):
+        storage.save(path, ContentFile(data))
+    return name
+
+
+def externalize_context_images(apps, schema_editor):
+    """Move base64 image context items into the content-addressed blob store."""
+    QuestionContext = apps.get_model('WebSurvey', 'QuestionContext')
+    storage = FileSystemStorage(location=settings.MEDIA_ROOT / 'blobs')
+    images = QuestionContext.objects.filter(context_type='image', content__startswith='data:')
+    for context in images.iterator(chunk_size=100):
+        name = _store_data_url(storage, context.content)
+        if name is not None:
+            QuestionContext.objects.filter(pk=context.pk).update(content=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WebSurvey', '0009_survey_revision'),
+    ]
+
+    operations = [
+        migrations.RunPython(externalize_context_images, migrations.RunPython.noop),
+    ]
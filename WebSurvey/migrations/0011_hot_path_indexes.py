@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WebSurvey', '0010_externalize_context_images'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='questionanswer',
+            index=models.Index(fields=['question', 'selected_option'], name='answer_question_option_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentresponse',
+            index=models.Index(fields=['survey', 'is_submitted'], name='response_survey_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentresponse',
+            index=models.Index(fields=['student', 'is_submitted'], name='response_student_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentresponse',
+            index=models.Index(condition=models.Q(('is_submitted', True)), fields=['-submitted_at', '-id'], name='response_recent_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='survey',
+            index=models.Index(fields=['teacher', '-created_at'], name='survey_teacher_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='survey',
+            index=models.Index(fields=['status', 'due_date'], name='survey_status_due_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# The index as WebSurvey.search defined it when this migration was written;
+# kept here so the migration does not change when that module does.
+SEARCH_TABLE = 'websurvey_response_search'
+_DOCUMENT_SQL = "u.username || ' ' || u.first_name || ' ' || u.last_name || ' ' || s.title"
+_SOURCE_SQL = (
+    'FROM "WebSurvey_studentresponse" r '
+    'INNER JOIN "WebSurvey_survey" s ON s.id = r.survey_id '
+    'INNER JOIN "WebSurvey_user" u ON u.id = r.student_id '
+    'WHERE r.is_submitted'
+)
+
+
+def build_search_index(apps, schema_editor):
+    """Create the full-text search table and index every submitted response."""
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+                "teacher_id UNINDEXED, content, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, teacher_id, content) '
+                f'SELECT r.id, s.teacher_id, {_DOCUMENT_SQL} {_SOURCE_SQL}'
+            )
+        elif vendor == 'postgresql':
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+                'response_id integer PRIMARY KEY, teacher_id integer NOT NULL, document tsvector NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx ON {SEARCH_TABLE} USING GIN (document)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_teacher_idx ON {SEARCH_TABLE} (teacher_id)'
+            )
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (response_id, teacher_id, document) '
+                f"SELECT r.id, s.teacher_id, to_tsvector('simple', {_DOCUMENT_SQL}) {_SOURCE_SQL}"
+            )
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('WebSurvey', '0011_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_search_index, remove_search_index),
+    ]
@@ -40,11 +40,19 @@ class Survey(models.Model):
     total_points = models.IntegerField(default=0)
     time_limit = models.IntegerField(null=True, blank=True, help_text="Time limit in minutes")
     due_date = models.DateTimeField(null=True, blank=True)
+    # Bumped on every builder save; clients send it back to detect conflicting edits
+    revision = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Teacher survey lists, newest first
+            models.Index(fields=['teacher', '-created_at'], name='survey_teacher_created_idx'),
+            # Auto-close sweep and the next-due-date watermark
+            models.Index(fields=['status', 'due_date'], name='survey_status_due_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -153,6 +161,16 @@ class StudentResponse(models.Model):
 
     class Meta:
         unique_together = ['survey', 'student']
+        indexes = [
+            models.Index(fields=['survey', 'is_submitted'], name='response_survey_submitted_idx'),
+            models.Index(fields=['student', 'is_submitted'], name='response_student_submitted_idx'),
+            # response_management lists submissions newest first
+            models.Index(
+                fields=['-submitted_at', '-id'],
+                condition=models.Q(is_submitted=True),
+                name='response_recent_submitted_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.survey.title}"
@@ -179,5 +197,111 @@ class QuestionAnswer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Per-option tallies (rebuild_answer_counts) and per-question answer lookups
+            models.Index(fields=['question', 'selected_option'], name='answer_question_option_idx'),
+        ]
+
     def __str__(self):
         return f"{self.response.student.username} - Q{self.question.order}"
+
+
+class AnswerCount(models.Model):
+    """Denormalized tally of submitted answers, maintained on submission.
+
+    One row per survey with no question holds the number of submitted
+    responses; the other rows count answers per multiple choice/likert option
+    or per true/false value. Rebuild with ``manage.py rebuild_answer_counts``.
+    """
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='answer_counts')
+    question = models.ForeignKey(Question, null=True, blank=True, on_delete=models.CASCADE, related_name='answer_counts')
+    selected_option = models.ForeignKey(MultipleChoiceOption, null=True, blank=True, on_delete=models.CASCADE, related_name='answer_counts')
+    true_false_answer = models.BooleanField(null=True, blank=True)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['survey'],
+                condition=models.Q(question__isnull=True),
+                name='unique_survey_response_count',
+            ),
+            models.UniqueConstraint(
+                fields=['selected_option'],
+                condition=models.Q(selected_option__isnull=False),
+                name='unique_option_answer_count',
+            ),
+            models.UniqueConstraint(
+                fields=['question', 'true_false_answer'],
+                condition=models.Q(true_false_answer__isnull=False),
+                name='unique_true_false_answer_count',
+            ),
+        ]
+
+    def __str__(self):
+        if self.question_id is None:
+            return f"{self.survey} - {self.count} responses"
+        return f"{self.question} - {self.count}"
+
+
+class ExportJob(models.Model):
+    """Background export of a teacher's responses, built by ``manage.py run_export_worker``."""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+    # Empty means every survey of the teacher
+    survey_ids = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    # Responses written so far out of the total
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    file_name = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The worker claims the oldest pending job
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Export #{self.id} by {self.teacher.username} ({self.status})"
+
+
+class StudentImportJob(models.Model):
+    """Background creation of student accounts from a validated CSV, run by ``manage.py run_export_worker``."""
+    STATUS_CHOICES = ExportJob.STATUS_CHOICES
+
+    teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name='import_jobs')
+    section = models.ForeignKey(Section, on_delete=models.CASCADE, related_name='import_jobs')
+    # Staging file holding the validated rows; passwords never go into the database
+    rows_file = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    # Passwords hashed so far out of the total
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The worker claims the oldest pending job
+            models.Index(fields=['status', 'created_at'], name='importjob_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Import #{self.id} into {self.section.name} ({self.status})"
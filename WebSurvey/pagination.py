@@ -0,0 +1,134 @@
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+COUNT_CACHE_KEY = 'websurvey:count:{digest}'
+COUNT_CACHE_TIMEOUT = 60
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset, with opaque cursors for its neighbours."""
+
+    def __init__(self, items, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = items
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def _encode_cursor(values):
+    # isoformat() keeps microseconds, which DjangoJSONEncoder would round away
+    values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+    raw = json.dumps(values, cls=DjangoJSONEncoder).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_cursor(cursor, model, fields):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(fields):
+        return None
+    try:
+        return [_cursor_value(model, field, value) for field, value in zip(fields, values)]
+    except Exception:
+        return None
+
+
+def _cursor_value(model, field, value):
+    try:
+        return model._meta.get_field(field).to_python(value)
+    except FieldDoesNotExist:
+        # An annotation such as a search rank; only numbers are accepted
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(value)
+        return value
+
+
+def _after(fields, values, descending):
+    """Q matching rows strictly after ``values`` in (fields...) order."""
+    lookup = 'lt' if descending else 'gt'
+    condition = Q()
+    for index, field in enumerate(fields):
+        clause = Q(**{f'{field}__{lookup}': values[index]})
+        for previous_field, previous_value in zip(fields[:index], values[:index]):
+            clause &= Q(**{previous_field: previous_value})
+        condition |= clause
+    return condition
+
+
+def keyset_paginate(queryset, fields, per_page, after=None, before=None):
+    """Return a ``KeysetPage`` of ``queryset`` ordered newest first by ``fields``.
+
+    ``fields`` must end with a unique column (normally ``'id'``) and hold no
+    NULLs; numeric annotations such as a search rank may be used too. Each page is a single indexed range query with no OFFSET and no
+    COUNT, so deep pages cost the same as the first one. ``after`` and
+    ``before`` are cursors taken from a previous page; an invalid cursor
+    falls back to the first page.
+    """
+    model = queryset.model
+    descending_order = [f'-{field}' for field in fields]
+    ascending_order = list(fields)
+
+    before_values = _decode_cursor(before, model, fields) if before else None
+    after_values = _decode_cursor(after, model, fields) if after and before_values is None else None
+
+    if before_values is not None:
+        rows = list(
+            queryset.filter(_after(fields, before_values, descending=False))
+            .order_by(*ascending_order)[:per_page + 1]
+        )
+        has_previous = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        if after_values is not None:
+            queryset = queryset.filter(_after(fields, after_values, descending=True))
+        rows = list(queryset.order_by(*descending_order)[:per_page + 1])
+        has_next = len(rows) > per_page
+        items = rows[:per_page]
+        has_previous = after_values is not None
+
+    def cursor_for(item):
+        return _encode_cursor([getattr(item, field) for field in fields])
+
+    return KeysetPage(
+        items,
+        has_next=has_next and bool(items),
+        has_previous=has_previous and bool(items),
+        next_cursor=cursor_for(items[-1]) if items else None,
+        previous_cursor=cursor_for(items[0]) if items else None,
+    )
+
+
+def cached_count(queryset, timeout=COUNT_CACHE_TIMEOUT):
+    """``queryset.count()``, cached for ``timeout`` seconds under a key derived from its SQL.
+
+    Keyset pages only show the total as a hint, so a count that lags behind
+    for up to a minute is fine and saves a COUNT over the filtered join on
+    every page turn.
+    """
+    digest = hashlib.sha1(str(queryset.query).encode('utf-8')).hexdigest()
+    return cache.get_or_set(COUNT_CACHE_KEY.format(digest=digest), queryset.count, timeout)
@@ -0,0 +1,165 @@
+"""Full-text search index over submitted responses (student names and survey title).
+
+SQLite uses an FTS5 virtual table and PostgreSQL a ``tsvector`` column with a
+GIN index. Other databases have no index; callers fall back to ``icontains``.
+The index is kept in sync by the signal handlers in ``signals.py`` and can be
+rebuilt with ``manage.py rebuild_search_index``.
+"""
+import re
+
+from django.db import connection as default_connection
+
+SEARCH_TABLE = 'websurvey_response_search'
+SUPPORTED_VENDORS = ('sqlite', 'postgresql')
+
+_DOCUMENT_SQL = "u.username || ' ' || u.first_name || ' ' || u.last_name || ' ' || s.title"
+_SOURCE_SQL = (
+    'FROM "WebSurvey_studentresponse" r '
+    'INNER JOIN "WebSurvey_survey" s ON s.id = r.survey_id '
+    'INNER JOIN "WebSurvey_user" u ON u.id = r.student_id '
+    'WHERE r.is_submitted AND {where}'
+)
+
+
+def is_search_supported(connection=default_connection):
+    return connection.vendor in SUPPORTED_VENDORS
+
+
+def create_search_table(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+                "teacher_id UNINDEXED, content, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+                'response_id integer PRIMARY KEY, teacher_id integer NOT NULL, document tsvector NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx ON {SEARCH_TABLE} USING GIN (document)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_teacher_idx ON {SEARCH_TABLE} (teacher_id)'
+            )
+
+
+def drop_search_table(connection):
+    if is_search_supported(connection):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+def _scope(response_ids=None, survey_id=None, student_id=None):
+    """SQL condition on ``r`` (StudentResponse) selecting the responses to (re)index."""
+    if response_ids is not None:
+        response_ids = [int(pk) for pk in response_ids]
+        if not response_ids:
+            return None, []
+        return f'r.id IN ({", ".join(["%s"] * len(response_ids))})', response_ids
+    if survey_id is not None:
+        return 'r.survey_id = %s', [survey_id]
+    if student_id is not None:
+        return 'r.student_id = %s', [student_id]
+    return '1 = 1', []
+
+
+def reindex_responses(response_ids=None, survey_id=None, student_id=None, connection=default_connection):
+    """Rebuild index rows for the given responses (all responses if no scope is given).
+
+    Runs as two set-based statements regardless of how many responses match;
+    responses that are not submitted end up without an index row.
+    """
+    if not is_search_supported(connection):
+        return
+    where, params = _scope(response_ids, survey_id, student_id)
+    if where is None:
+        return
+    key = 'rowid' if connection.vendor == 'sqlite' else 'response_id'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE {key} IN '
+            f'(SELECT r.id FROM "WebSurvey_studentresponse" r WHERE {where})',
+            params,
+        )
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, teacher_id, content) '
+                f'SELECT r.id, s.teacher_id, {_DOCUMENT_SQL} ' + _SOURCE_SQL.format(where=where),
+                params,
+            )
+        else:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (response_id, teacher_id, document) '
+                f"SELECT r.id, s.teacher_id, to_tsvector('simple', {_DOCUMENT_SQL}) "
+                + _SOURCE_SQL.format(where=where),
+                params,
+            )
+
+
+def remove_responses(response_ids, connection=default_connection):
+    if not is_search_supported(connection) or not response_ids:
+        return
+    key = 'rowid' if connection.vendor == 'sqlite' else 'response_id'
+    placeholders = ', '.join(['%s'] * len(response_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE {key} IN ({placeholders})', list(response_ids))
+
+
+def _match_query(text, vendor):
+    """Turn free text into a prefix query matching every word, or None if it has no words."""
+    words = re.findall(r'\w+', text.lower())
+    if not words:
+        return None
+    if vendor == 'sqlite':
+        return ' '.join(f'"{word}"*' for word in words)
+    return ' & '.join(f'{word}:*' for word in words)
+
+
+def search_sql(teacher_id, text, connection=default_connection):
+    """Return ``(sql, params)`` selecting matching response ids for an ``id__in=RawSQL(...)`` filter, or None.
+
+    None means the backend has no search index and the caller should fall
+    back to ``icontains`` filtering. Text without any words matches nothing.
+    """
+    if not is_search_supported(connection):
+        return None
+    match = _match_query(text, connection.vendor)
+    if match is None:
+        return 'SELECT NULL WHERE 1 = 0', []
+    if connection.vendor == 'sqlite':
+        return (
+            f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND teacher_id = %s',
+            [match, teacher_id],
+        )
+    return (
+        f"SELECT response_id FROM {SEARCH_TABLE} WHERE document @@ to_tsquery('simple', %s) AND teacher_id = %s",
+        [match, teacher_id],
+    )
+
+
+def search_rank_sql(text, connection=default_connection):
+    """Return ``(sql, params)`` scoring each response's match for an ``annotate(RawSQL(...))``, or None.
+
+    The score is a subquery correlated with ``WebSurvey_studentresponse``:
+    bm25 on SQLite and ``ts_rank`` on PostgreSQL, higher meaning a better
+    match. It is only meaningful on rows already filtered with ``search_sql``.
+    """
+    if not is_search_supported(connection):
+        return None
+    match = _match_query(text, connection.vendor)
+    if match is None:
+        return None
+    if connection.vendor == 'sqlite':
+        # bm25() is lower for better matches
+        return (
+            f'SELECT -bm25({SEARCH_TABLE}) FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s AND rowid = "WebSurvey_studentresponse"."id"',
+            [match],
+        )
+    return (
+        f"SELECT ts_rank(document, to_tsquery('simple', %s)) FROM {SEARCH_TABLE} "
+        'WHERE response_id = "WebSurvey_studentresponse"."id"',
+        [match],
+    )
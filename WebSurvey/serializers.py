@@ -0,0 +1,121 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .images import image_url
+from .models import (
+    Question,
+    MultipleChoiceOption,
+    EnumerationAnswer,
+    QuestionContext,
+)
+
+CHOICE_TYPES = ('multiple_choice', 'likert')
+# Surveys with more questions than this are streamed rather than encoded at once
+STREAM_QUESTION_THRESHOLD = 200
+
+
+def load_survey_tree(survey):
+    """Fetch every question of ``survey`` with all its children.
+
+    Runs a fixed number of queries (questions joined with their true/false
+    key, plus one each for options, enumeration answers and context items)
+    however many questions the survey has.
+    """
+    return list(
+        Question.objects.filter(survey=survey)
+        .order_by('order', 'id')
+        .select_related('true_false_answer')
+        .prefetch_related(
+            Prefetch('options', queryset=MultipleChoiceOption.objects.order_by('order', 'id')),
+            Prefetch('enumeration_answers', queryset=EnumerationAnswer.objects.order_by('order', 'id')),
+            Prefetch('context_items', queryset=QuestionContext.objects.order_by('order', 'id')),
+        )
+    )
+
+
+def serialize_question(question):
+    """Builder representation of a question loaded by ``load_survey_tree``."""
+    q_data = {
+        'id': question.id,
+        'type': question.question_type,
+        'text': question.question_text,
+        'points': question.points,
+        'required': question.required,
+        'order': question.order
+    }
+
+    if question.question_type in CHOICE_TYPES:
+        q_data['options'] = [
+            {
+                'id': opt.id,
+                'text': opt.option_text,
+                'is_correct': opt.is_correct
+            }
+            for opt in question.options.all()
+        ]
+
+    elif question.question_type == 'true_false':
+        if hasattr(question, 'true_false_answer'):
+            q_data['correct_answer'] = question.true_false_answer.is_true
+
+    elif question.question_type == 'enumeration':
+        q_data['answers'] = [
+            ans.answer_text for ans in question.enumeration_answers.all()
+        ]
+
+    q_data['context_items'] = [
+        {
+            'id': ctx.id,
+            'type': ctx.context_type,
+            'content': image_url(ctx.content) if ctx.context_type == 'image' else ctx.content,
+            'language': ctx.language,
+            'order': ctx.order
+        }
+        for ctx in question.context_items.all()
+    ]
+    return q_data
+
+
+def serialize_survey_metadata(survey):
+    """Survey-level fields of the builder representation (everything but questions)."""
+    return {
+        'id': survey.id,
+        'title': survey.title,
+        'description': survey.description,
+        'status': survey.status,
+        'time_limit': survey.time_limit,
+        'due_date': survey.due_date.isoformat() if survey.due_date else None,
+        'sections': list(survey.sections.values_list('id', flat=True)),
+        'total_points': survey.total_points,
+        'revision': survey.revision,
+    }
+
+
+def serialize_survey(survey, questions=None):
+    """Full builder representation of ``survey`` as a dict."""
+    if questions is None:
+        questions = load_survey_tree(survey)
+    survey_data = serialize_survey_metadata(survey)
+    survey_data['questions'] = [serialize_question(q) for q in questions]
+    return survey_data
+
+
+def iter_survey_json(survey, questions=None, envelope=None):
+    """Yield ``serialize_survey`` as JSON text, one question at a time.
+
+    Produces the same document as ``json.dumps`` of the dict but never holds
+    the whole encoded survey in memory. ``envelope`` wraps the survey as
+    ``{**envelope, "survey": {...}}``.
+    """
+    if questions is None:
+        questions = load_survey_tree(survey)
+    encoder = DjangoJSONEncoder()
+    head = encoder.encode(serialize_survey_metadata(survey))[:-1]
+    if envelope is not None:
+        yield encoder.encode(envelope)[:-1] + (', ' if envelope else '') + '"survey": '
+    yield head + ', "questions": ['
+    for index, question in enumerate(questions):
+        yield (', ' if index else '') + encoder.encode(serialize_question(question))
+    yield ']}'
+    if envelope is not None:
+        yield '}'
@@ -1,25 +1,71 @@
+from django.core.cache import cache
+from django.db.models import Min
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime
 
 from .models import Survey
+from .student_summary import bump_section_surveys_version
+
+# Cache key holding the earliest due date among published surveys.
+NEXT_DUE_DATE_CACHE_KEY = 'websurvey:auto_close:next_due_date'
+# Upper bound on how long a process trusts its watermark, so a due date set
+# through another worker process is still picked up reasonably quickly.
+NEXT_DUE_DATE_CACHE_TIMEOUT = 60
+# Stored when no published survey has a due date (None means "cache miss").
+_NO_DUE_DATE = 'none'
 
 
 def auto_close_due_surveys():
     """Mark published surveys as closed once their due date has passed."""
     now = timezone.now()
-    overdue_ids = []
-    for survey in Survey.objects.filter(status='published', due_date__isnull=False):
-        due = survey.due_date
-        if due is None:
-            continue
-        if timezone.is_naive(due):
-            due = timezone.make_aware(due, timezone.get_current_timezone())
-        if due <= now:
-            overdue_ids.append(survey.id)
-
-    if overdue_ids:
-        Survey.objects.filter(id__in=overdue_ids).update(status='closed')
+    due_ids = list(Survey.objects.filter(status='published', due_date__lte=now).values_list('id', flat=True))
+    if not due_ids:
+        return now
+    # Bulk update skips post_save, so refresh the dependent caches by hand
+    Survey.objects.filter(id__in=due_ids, status='published').update(status='closed', updated_at=now)
+    invalidate_next_due_date()
+    bump_section_surveys_version(
+        Survey.sections.through.objects.filter(survey_id__in=due_ids)
+        .values_list('section_id', flat=True).distinct()
+    )
+    return now
+
+
+def get_next_due_date(refresh=False):
+    """Return the earliest due date of any published survey, or None."""
+    cached = None if refresh else cache.get(NEXT_DUE_DATE_CACHE_KEY)
+    if cached is None:
+        next_due = Survey.objects.filter(
+            status='published', due_date__isnull=False
+        ).aggregate(next_due=Min('due_date'))['next_due']
+        cache.set(
+            NEXT_DUE_DATE_CACHE_KEY,
+            next_due if next_due is not None else _NO_DUE_DATE,
+            NEXT_DUE_DATE_CACHE_TIMEOUT,
+        )
+        return next_due
+    if cached == _NO_DUE_DATE:
+        return None
+    return cached
 
+
+def invalidate_next_due_date():
+    """Forget the cached due-date watermark so it is recomputed on next use."""
+    cache.delete(NEXT_DUE_DATE_CACHE_KEY)
+
+
+def close_due_surveys_if_needed():
+    """Close overdue surveys, touching the database only once a due date passed.
+
+    Cheap enough for the request path: until the cached watermark is reached
+    this is a single cache lookup.
+    """
+    now = timezone.now()
+    next_due = get_next_due_date()
+    if next_due is None or next_due > now:
+        return now
+    auto_close_due_surveys()
+    get_next_due_date(refresh=True)
     return now
 
 
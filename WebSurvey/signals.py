@@ -0,0 +1,166 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .analytics import retract_submission, retract_submissions
+from .models import StudentResponse, Survey, User
+from .search import reindex_responses, remove_responses
+from .services import invalidate_next_due_date
+from .snapshots import build_survey_snapshot, invalidate_survey_snapshot
+from .student_summary import bump_section_surveys_version, invalidate_student_summary
+
+SEARCHED_SURVEY_FIELDS = ('title', 'teacher_id')
+SEARCHED_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=Survey)
+@receiver(post_delete, sender=Survey)
+def reset_due_date_watermark(sender, instance, **kwargs):
+    """Status or due date may have changed, so the next-due watermark is stale."""
+    invalidate_next_due_date()
+
+
+@receiver(post_save, sender=Survey)
+def refresh_survey_snapshot(sender, instance, **kwargs):
+    """Drop the take-survey snapshot and prebuild it once a published survey is saved.
+
+    The rebuild waits for the commit so questions synced in the same
+    transaction are included.
+    """
+    invalidate_survey_snapshot(instance.id)
+    if instance.status == 'published':
+        transaction.on_commit(lambda: build_survey_snapshot(instance))
+
+
+@receiver(post_delete, sender=Survey)
+def drop_survey_snapshot(sender, instance, **kwargs):
+    invalidate_survey_snapshot(instance.id)
+
+
+@receiver(post_save, sender=Survey)
+@receiver(pre_delete, sender=Survey)
+def refresh_section_student_summaries(sender, instance, **kwargs):
+    """Status, due date or questions may have changed for every student of the survey's sections."""
+    bump_section_surveys_version(instance.sections.values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=Survey.sections.through)
+def refresh_student_summaries_on_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    """A survey was assigned to or removed from sections."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        bump_section_surveys_version([instance.id])
+    elif action == 'pre_clear':
+        bump_section_surveys_version(instance.sections.values_list('id', flat=True))
+    else:
+        bump_section_surveys_version(pk_set)
+
+
+@receiver(post_save, sender=StudentResponse)
+@receiver(post_delete, sender=StudentResponse)
+def refresh_student_summary(sender, instance, **kwargs):
+    invalidate_student_summary(instance.student_id)
+
+
+def _origin_model(origin):
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+def _deleted_submissions(origin):
+    """Submitted responses a delete started from ``origin`` removes, or None if they can't be queried up front."""
+    model = _origin_model(origin)
+    if model is StudentResponse and isinstance(origin, QuerySet):
+        return origin.filter(is_submitted=True)
+    if model is User:
+        students = origin if isinstance(origin, QuerySet) else [origin]
+        return StudentResponse.objects.filter(student__in=students, is_submitted=True)
+    return None
+
+
+@receiver(pre_delete, sender=StudentResponse)
+def retract_deleted_submission(sender, instance, origin=None, **kwargs):
+    """Keep answer counters in step when submitted responses are deleted.
+
+    Runs before the delete so the answers can still be read. Deleting a
+    survey takes its counters with it, so nothing is retracted then. Deleting
+    users or a queryset of responses retracts every response it removes in
+    one batch, on the first signal of that delete.
+    """
+    if _origin_model(origin) is Survey:
+        return
+    responses = _deleted_submissions(origin)
+    if responses is None:
+        if instance.is_submitted:
+            retract_submission(instance)
+    elif not getattr(origin, '_answer_counts_retracted', False):
+        origin._answer_counts_retracted = True
+        retract_submissions(responses)
+
+
+def _fields_changed(instance, fields, update_fields):
+    """True if a save of an existing row is about to change any of ``fields``."""
+    if instance.pk is None:
+        return False
+    if update_fields is not None:
+        names = set(fields) | {field.removesuffix('_id') for field in fields}
+        if not names & set(update_fields):
+            return False
+    old = type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+    return old is not None and any(old[field] != getattr(instance, field) for field in fields)
+
+
+@receiver(pre_save, sender=StudentResponse)
+def check_response_unsubmitted(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Take a submission that is being reverted out of the answer counters.
+
+    Runs before the save, while the counted answers can still be read.
+    """
+    instance._unsubmitted = (
+        not raw and not instance.is_submitted and _fields_changed(instance, ('is_submitted',), update_fields)
+    )
+    if instance._unsubmitted:
+        retract_submission(instance)
+
+
+@receiver(post_save, sender=StudentResponse)
+def index_response(sender, instance, raw=False, **kwargs):
+    """Add a submitted response to the search index (or drop one that was unsubmitted).
+
+    Drafts were never indexed, so saving one leaves the index alone.
+    """
+    if raw:
+        return
+    if instance.is_submitted or getattr(instance, '_unsubmitted', False):
+        reindex_responses(response_ids=[instance.id])
+
+
+@receiver(post_delete, sender=StudentResponse)
+def unindex_response(sender, instance, **kwargs):
+    remove_responses([instance.id])
+
+
+@receiver(pre_save, sender=Survey)
+def check_survey_search_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._search_fields_changed = not raw and _fields_changed(instance, SEARCHED_SURVEY_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=Survey)
+def reindex_survey_responses(sender, instance, **kwargs):
+    """The survey title is part of every one of its responses' search documents."""
+    if getattr(instance, '_search_fields_changed', False):
+        reindex_responses(survey_id=instance.id)
+
+
+@receiver(pre_save, sender=User)
+def check_student_search_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._search_fields_changed = (
+        not raw and instance.role == 'student' and _fields_changed(instance, SEARCHED_USER_FIELDS, update_fields)
+    )
+
+
+@receiver(post_save, sender=User)
+def reindex_student_responses(sender, instance, **kwargs):
+    if getattr(instance, '_search_fields_changed', False):
+        reindex_responses(student_id=instance.id)
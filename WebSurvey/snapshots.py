@@ -0,0 +1,60 @@
+from django.core.cache import cache
+
+from .images import image_srcset, image_url
+from .serializers import load_survey_tree
+
+SURVEY_SNAPSHOT_CACHE_KEY = 'websurvey:survey_snapshot:{survey_id}'
+SURVEY_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+
+def _snapshot_question(question):
+    return {
+        'id': question.id,
+        'question_type': question.question_type,
+        'question_text': question.question_text,
+        'type_display': question.get_question_type_display(),
+        'required': question.required,
+        'options': [
+            {'id': option.id, 'option_text': option.option_text}
+            for option in question.options.all()
+        ],
+        'context_items': [
+            {
+                'context_type': ctx.context_type,
+                'content': image_url(ctx.content) if ctx.context_type == 'image' else ctx.content,
+                'language': ctx.language,
+                'srcset': image_srcset(ctx.content) if ctx.context_type == 'image' else '',
+            }
+            for ctx in question.context_items.all()
+        ],
+    }
+
+
+def build_survey_snapshot(survey):
+    """Serialize the question tree students see and store it in the cache.
+
+    The snapshot is plain data (no model instances) tagged with the survey
+    revision it was built from; correct answers are deliberately left out.
+    """
+    snapshot = {
+        'revision': survey.revision,
+        'questions': [_snapshot_question(q) for q in load_survey_tree(survey)],
+    }
+    cache.set(SURVEY_SNAPSHOT_CACHE_KEY.format(survey_id=survey.id), snapshot, SURVEY_SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def get_survey_snapshot(survey):
+    """Return the cached snapshot for ``survey``, rebuilding it if it is missing or stale.
+
+    Every builder save bumps ``Survey.revision``, so a snapshot built from an
+    older revision is never served.
+    """
+    snapshot = cache.get(SURVEY_SNAPSHOT_CACHE_KEY.format(survey_id=survey.id))
+    if snapshot is None or snapshot['revision'] != survey.revision:
+        snapshot = build_survey_snapshot(survey)
+    return snapshot
+
+
+def invalidate_survey_snapshot(survey_id):
+    cache.delete(SURVEY_SNAPSHOT_CACHE_KEY.format(survey_id=survey_id))
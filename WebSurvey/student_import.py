@@ -0,0 +1,283 @@
+"""Bulk creation of student accounts from a CSV file.
+
+The file is validated entirely in memory, with one query for usernames and
+emails that are already taken. Passwords are hashed in a process pool since
+PBKDF2 is deliberately slow, and the accounts are written with
+``bulk_create`` already assigned to their section.
+
+Hashing thousands of passwords takes minutes, so the web view only
+validates the file and queues a ``StudentImportJob``; ``manage.py
+run_export_worker`` creates the accounts while the page polls the job.
+Until then the rows wait in an owner-only file under ``IMPORT_STAGING_ROOT``
+rather than in the database. ``manage.py import_students`` imports a file
+directly.
+"""
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import StudentImportJob, User
+
+logger = logging.getLogger(__name__)
+
+IMPORT_COLUMNS = ('username', 'email', 'first_name', 'last_name', 'password')
+REQUIRED_COLUMNS = ('username', 'password')
+MAX_IMPORT_ROWS = 10000
+MIN_PASSWORD_LENGTH = 8
+# Below this many passwords starting worker processes costs more than it saves
+HASH_POOL_THRESHOLD = 20
+# Stop listing problems after this many so the response stays readable
+MAX_REPORTED_ERRORS = 50
+MAX_IMPORT_FILE_SIZE = 5 * 1024 * 1024
+# Passwords hashed between progress updates of an import job
+IMPORT_PROGRESS_STEP = 50
+
+
+def _read_rows(text):
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        return None, 'The file is empty'
+    reader.fieldnames = [(name or '').strip().lower() for name in reader.fieldnames]
+    missing = [column for column in REQUIRED_COLUMNS if column not in reader.fieldnames]
+    if missing:
+        return None, f'Missing column(s): {", ".join(missing)}'
+    return reader, None
+
+
+def _format_errors(errors):
+    """Sort ``(line, message)`` pairs by line and cap how many are reported."""
+    messages = [f'Line {line}: {message}' if line else message for line, message in sorted(errors)]
+    if len(messages) > MAX_REPORTED_ERRORS:
+        hidden = len(messages) - MAX_REPORTED_ERRORS
+        messages = messages[:MAX_REPORTED_ERRORS] + [f'...and {hidden} more problem(s)']
+    return messages
+
+
+def parse_student_csv(text):
+    """Validate a CSV of students and return ``(rows, errors)``.
+
+    ``rows`` are dicts with the ``IMPORT_COLUMNS`` keys. The file is only
+    usable when ``errors`` is empty; every problem is reported with its line
+    number so the teacher can fix them all in one go.
+    """
+    reader, problem = _read_rows(text)
+    if reader is None:
+        return [], [problem]
+
+    rows = []
+    errors = []
+    usernames = {}
+    emails = {}
+    for line, record in enumerate(reader, start=2):
+        if len(rows) >= MAX_IMPORT_ROWS:
+            errors.append((0, f'Too many rows; import at most {MAX_IMPORT_ROWS} students at a time'))
+            break
+        row = {column: (record.get(column) or '').strip() for column in IMPORT_COLUMNS}
+        row['password'] = record.get('password') or ''
+        row['line'] = line
+        if not any(row[column] for column in IMPORT_COLUMNS):
+            continue
+
+        username = row['username']
+        if not username:
+            errors.append((line, 'username is required'))
+        else:
+            try:
+                User.username_validator(username)
+            except ValidationError:
+                errors.append((line, f'"{username}" is not a valid username'))
+            if len(username) > 150:
+                errors.append((line, 'username is longer than 150 characters'))
+            if username in usernames:
+                errors.append((line, f'username "{username}" is repeated from line {usernames[username]}'))
+            usernames.setdefault(username, line)
+
+        email = row['email']
+        if email:
+            try:
+                validate_email(email)
+            except ValidationError:
+                errors.append((line, f'"{email}" is not a valid email address'))
+            if email in emails:
+                errors.append((line, f'email "{email}" is repeated from line {emails[email]}'))
+            emails.setdefault(email, line)
+
+        if len(row['password']) < MIN_PASSWORD_LENGTH:
+            errors.append((line, f'password must be at least {MIN_PASSWORD_LENGTH} characters long'))
+        rows.append(row)
+
+    if not rows and not errors:
+        errors.append((0, 'The file has no students'))
+
+    taken = User.objects.filter(Q(username__in=usernames) | Q(email__in=emails)).values_list('username', 'email')
+    for username, email in taken:
+        if username in usernames:
+            errors.append((usernames[username], f'username "{username}" already exists'))
+        if email in emails:
+            errors.append((emails[email], f'email "{email}" is already registered'))
+
+    return rows, _format_errors(errors)
+
+
+def hash_passwords(passwords, processes=None, progress=None):
+    """``make_password`` for each password, spread over a process pool for large batches.
+
+    ``progress(done)`` is called every ``IMPORT_PROGRESS_STEP`` passwords.
+    """
+    if len(passwords) < HASH_POOL_THRESHOLD:
+        return _collect_hashes(map(make_password, passwords), progress)
+    processes = processes or os.cpu_count() or 1
+    # Spawned children do not inherit the web server's threads or open connections
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=django.setup) as pool:
+        chunksize = max(1, len(passwords) // (processes * 4))
+        return _collect_hashes(pool.map(make_password, passwords, chunksize=chunksize), progress)
+
+
+def _collect_hashes(hashes, progress):
+    collected = []
+    for password_hash in hashes:
+        collected.append(password_hash)
+        if progress is not None and len(collected) % IMPORT_PROGRESS_STEP == 0:
+            progress(len(collected))
+    return collected
+
+
+def import_students(rows, section, processes=None, progress=None):
+    """Create a student account in ``section`` for every validated row and return the new users."""
+    hashes = hash_passwords([row['password'] for row in rows], processes, progress)
+    users = [
+        User(
+            username=row['username'],
+            email=row['email'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            role='student',
+            section=section,
+            password=password_hash,
+        )
+        for row, password_hash in zip(rows, hashes)
+    ]
+    with transaction.atomic():
+        return User.objects.bulk_create(users, batch_size=500)
+
+
+def _staging_path(name):
+    return os.path.join(settings.IMPORT_STAGING_ROOT, name)
+
+
+def stage_rows(rows):
+    """Write validated rows to a new owner-only staging file and return its name."""
+    os.makedirs(settings.IMPORT_STAGING_ROOT, mode=0o700, exist_ok=True)
+    name = f'{secrets.token_hex(16)}.json'
+    fd = os.open(_staging_path(name), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as staging_file:
+        json.dump(rows, staging_file)
+    return name
+
+
+def take_staged_rows(name):
+    """Read a staging file and delete it; returns None if it is gone."""
+    try:
+        with open(_staging_path(name), encoding='utf-8') as staging_file:
+            rows = json.load(staging_file)
+    except (FileNotFoundError, ValueError):
+        rows = None
+    discard_staged_rows(name)
+    return rows
+
+
+def discard_staged_rows(name):
+    if not name:
+        return
+    try:
+        os.remove(_staging_path(name))
+    except FileNotFoundError:
+        pass
+
+
+def expire_stale_imports():
+    """Fail pending imports older than ``IMPORT_STAGING_TIMEOUT`` and delete their passwords.
+
+    Bounds how long plain-text passwords sit on disk when no worker is running.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.IMPORT_STAGING_TIMEOUT)
+    stale = StudentImportJob.objects.filter(status='pending', created_at__lt=cutoff)
+    for job_id, name in stale.values_list('id', 'rows_file'):
+        updated = StudentImportJob.objects.filter(id=job_id, status='pending').update(
+            status='failed', rows_file='', finished_at=timezone.now(),
+            error='The import was not started in time; please upload the file again',
+        )
+        if updated:
+            discard_staged_rows(name)
+
+
+def enqueue_import(teacher, section, rows):
+    """Queue the creation of ``rows`` (from ``parse_student_csv``) in ``section``."""
+    expire_stale_imports()
+    name = stage_rows(rows)
+    try:
+        return StudentImportJob.objects.create(teacher=teacher, section=section, rows_file=name, total=len(rows))
+    except Exception:
+        discard_staged_rows(name)
+        raise
+
+
+def run_import_job(job_id, processes=None):
+    """Create the accounts of a claimed import job and record the outcome. Runs in a worker process."""
+    job = StudentImportJob.objects.select_related('section').get(id=job_id)
+    # The staging file is deleted as soon as it is read, whatever happens next
+    rows = take_staged_rows(job.rows_file) if job.rows_file else None
+
+    def report(done):
+        StudentImportJob.objects.filter(id=job_id).update(progress=done)
+
+    if rows is None:
+        error = 'The uploaded students are no longer available; please upload the file again'
+    else:
+        try:
+            users = import_students(rows, job.section, processes, report)
+        except IntegrityError:
+            error = 'Some usernames or emails were taken while importing; no students were imported'
+        except Exception as e:
+            logger.exception(f"Import job {job_id} failed")
+            error = str(e)
+        else:
+            StudentImportJob.objects.filter(id=job_id).update(
+                status='done', rows_file='', progress=job.total, created=len(users), finished_at=timezone.now()
+            )
+            return 'done'
+    StudentImportJob.objects.filter(id=job_id).update(
+        status='failed', rows_file='', error=error, finished_at=timezone.now()
+    )
+    return 'failed'
+
+
+def import_status(job):
+    """Plain-data status of a job (a dict from ``StudentImportJob.objects.values()``) for the polling endpoint."""
+    data = {
+        'id': job['id'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'total': job['total'],
+    }
+    if job['status'] == 'done':
+        data['created'] = job['created']
+    elif job['status'] == 'failed':
+        data['error'] = job['error']
+    return data
@@ -0,0 +1,85 @@
+import uuid
+
+from django.core.cache import cache
+
+from .models import StudentResponse, Survey
+
+STUDENT_SUMMARY_CACHE_KEY = 'websurvey:student_summary:{user_id}'
+SECTION_SURVEYS_VERSION_CACHE_KEY = 'websurvey:section_surveys:version:{section_id}'
+# The summaries and section tokens live in the per-process cache, so signals
+# only reach the process that handled the change. Like the next-due watermark,
+# nothing is trusted for longer than this, which bounds how stale another
+# worker process can be.
+STUDENT_SUMMARY_TIMEOUT = 60
+
+
+def get_section_surveys_version(section_id):
+    """Opaque token that changes whenever the surveys visible to a section may have changed."""
+    return cache.get_or_set(
+        SECTION_SURVEYS_VERSION_CACHE_KEY.format(section_id=section_id),
+        lambda: uuid.uuid4().hex,
+        STUDENT_SUMMARY_TIMEOUT,
+    )
+
+
+def bump_section_surveys_version(section_ids):
+    """Invalidate the cached summaries of every student in the given sections."""
+    cache.set_many(
+        {SECTION_SURVEYS_VERSION_CACHE_KEY.format(section_id=section_id): uuid.uuid4().hex for section_id in section_ids},
+        STUDENT_SUMMARY_TIMEOUT,
+    )
+
+
+def invalidate_student_summary(user_id):
+    cache.delete(STUDENT_SUMMARY_CACHE_KEY.format(user_id=user_id))
+
+
+def _build_student_summary(user, section_id, version):
+    responses = {
+        survey_id: (response_id, is_submitted)
+        for response_id, survey_id, is_submitted in StudentResponse.objects.filter(
+            student=user,
+            survey__sections=section_id,
+            survey__status__in=['published', 'closed'],
+        ).values_list('id', 'survey_id', 'is_submitted')
+    }
+    surveys = (
+        Survey.objects.filter(sections=section_id, status__in=['published', 'closed'])
+        .values_list('id', 'status', 'due_date')
+        .distinct()
+    )
+    entries = []
+    for survey_id, status, due_date in surveys:
+        response_id, is_submitted = responses.get(survey_id, (None, False))
+        entries.append({
+            'survey_id': survey_id,
+            'status': status,
+            'due_date': due_date,
+            'response_id': response_id,
+            'is_submitted': is_submitted,
+        })
+    return {'section_id': section_id, 'version': version, 'entries': entries}
+
+
+def get_student_summary(user):
+    """Return the surveys visible to a student together with their own response state.
+
+    The summary is plain data cached per student: one entry per published or
+    closed survey assigned to the student's section, newest first. It is
+    rebuilt when the student's section changes, when a survey of that section
+    changes (see ``bump_section_surveys_version``) or when one of the
+    student's responses changes (see ``invalidate_student_summary``), and
+    at the latest after ``STUDENT_SUMMARY_TIMEOUT``.
+    Time-dependent flags such as "overdue" are left to the caller.
+    """
+    section_id = user.section_id
+    if not section_id:
+        return {'section_id': None, 'version': None, 'entries': []}
+
+    version = get_section_surveys_version(section_id)
+    key = STUDENT_SUMMARY_CACHE_KEY.format(user_id=user.id)
+    summary = cache.get(key)
+    if summary is None or summary['section_id'] != section_id or summary['version'] != version:
+        summary = _build_student_summary(user, section_id, version)
+        cache.set(key, summary, STUDENT_SUMMARY_TIMEOUT)
+    return summary
@@ -0,0 +1,415 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .images import context_image_content
+from .models import (
+    Survey,
+    Question,
+    MultipleChoiceOption,
+    TrueFalseAnswer,
+    EnumerationAnswer,
+    QuestionContext,
+)
+
+logger = logging.getLogger(__name__)
+
+TEXT_ELEMENT_TYPES = ('heading', 'subheading', 'paragraph')
+CHOICE_TYPES = ('multiple_choice', 'likert')
+QUESTION_FIELDS = ['question_type', 'question_text', 'points', 'order', 'required']
+
+
+class _ChangeSet:
+    """Rows to insert, update and delete for one model, flushed in bulk."""
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = fields
+        self.to_create = []
+        self.to_update = []
+        self.to_delete = []
+
+    def assign(self, obj, values):
+        """Apply ``values`` to an existing row, queueing an update only if something changed."""
+        changed = False
+        for field, value in values.items():
+            if getattr(obj, field) != value:
+                setattr(obj, field, value)
+                changed = True
+        if changed:
+            self.to_update.append(obj)
+        return changed
+
+    def flush(self):
+        if self.to_delete:
+            self.model.objects.filter(id__in=self.to_delete).delete()
+        if self.to_update:
+            self.model.objects.bulk_update(self.to_update, self.fields)
+        if self.to_create:
+            self.model.objects.bulk_create(self.to_create)
+
+
+def _question_values(q_type, q_text, order, q_data):
+    # Text elements (heading, subheading, paragraph) are never required
+    is_text_element = q_type in TEXT_ELEMENT_TYPES
+    return {
+        'question_type': q_type,
+        'question_text': q_text,
+        'points': 0,  # points removed for survey mode
+        'order': order,
+        'required': False if is_text_element else bool(q_data.get('required', True)),
+    }
+
+
+def _desired_children(question, q_data):
+    """Child rows a question should end up with: options as ``(id, fields)`` pairs, the rest as field dicts."""
+    q_type = question.question_type
+    options = []
+    enumeration_answers = []
+    true_false = None
+    context_items = []
+    if q_data is None:
+        return options, enumeration_answers, true_false, context_items
+
+    if q_type in CHOICE_TYPES:
+        raw_options = q_data.get('options') or []
+        if not raw_options:
+            logger.warning(f"{q_type} question {question.order} has no options")
+        for opt_idx, option in enumerate(raw_options):
+            options.append((option.get('id'), {
+                'option_text': option.get('text', ''),
+                'is_correct': bool(option.get('is_correct') or option.get('correct')) if q_type == 'multiple_choice' else False,
+                'order': opt_idx,
+            }))
+    elif q_type == 'true_false':
+        true_false = bool(q_data.get('correct_answer', True))
+    elif q_type == 'enumeration':
+        answers = q_data.get('answers') or []
+        if not answers:
+            logger.warning(f"Enumeration question {question.order} has no answers")
+        for ans_idx, answer in enumerate(answers):
+            enumeration_answers.append({'answer_text': str(answer), 'order': ans_idx})
+
+    for ctx_item in q_data.get('context_items') or []:
+        context_type = ctx_item.get('type', 'code_snippet')
+        content = ctx_item.get('content', '')
+        if context_type == 'image':
+            # Keep base64 payloads out of the database; store the blob name instead
+            content = context_image_content(content)
+        context_items.append({
+            'context_type': context_type,
+            'content': content,
+            'language': ctx_item.get('language', ''),
+            'order': ctx_item.get('order', 0),
+        })
+    return options, enumeration_answers, true_false, context_items
+
+
+def _context_client_ids(q_data):
+    if q_data is None:
+        return []
+    return [ctx_item.get('client_id') for ctx_item in q_data.get('context_items') or []]
+
+
+def _option_client_ids(question, q_data):
+    if q_data is None or question.question_type not in CHOICE_TYPES:
+        return []
+    return [option.get('client_id') for option in q_data.get('options') or []]
+
+
+def _sync_list(changes, question, existing, desired):
+    """Match child rows by position: update in place, then add or drop the tail.
+
+    Returns the rows that will hold ``desired``, in the same order.
+    """
+    rows = []
+    for idx, values in enumerate(desired):
+        if idx < len(existing):
+            changes.assign(existing[idx], values)
+            rows.append(existing[idx])
+        else:
+            row = changes.model(question=question, **values)
+            changes.to_create.append(row)
+            rows.append(row)
+    changes.to_delete.extend(obj.id for obj in existing[len(desired):])
+    return rows
+
+
+def _sync_by_id(changes, question, existing, desired):
+    """Match child rows by ``id``: update matches in place, add the rest, drop the unmatched.
+
+    ``desired`` holds ``(id, values)`` pairs; ids that are missing, unknown or
+    repeated get a new row. Returns the rows that will hold ``desired``, in
+    the same order.
+    """
+    existing = {obj.id: obj for obj in existing}
+    matched_ids = set()
+    rows = []
+    for raw_id, values in desired:
+        try:
+            obj = existing.get(int(raw_id)) if raw_id else None
+        except (TypeError, ValueError):
+            obj = None
+        if obj is None or obj.id in matched_ids:
+            obj = changes.model(question=question, **values)
+            changes.to_create.append(obj)
+        else:
+            matched_ids.add(obj.id)
+            changes.assign(obj, values)
+        rows.append(obj)
+    changes.to_delete.extend(obj_id for obj_id in existing if obj_id not in matched_ids)
+    return rows
+
+
+def sync_survey_questions(survey, questions_data):
+    """Bring a survey's questions in line with the builder payload.
+
+    Incoming questions are matched to existing ones by ``id``; matched rows are
+    updated only where a field changed, unmatched ones are bulk-inserted, and
+    questions missing from the payload are deleted. Options are matched by
+    ``id`` the same way, so editing, reordering or removing an option never
+    moves student answers or answer counts onto another option's text.
+    Enumeration answers and context items are matched by position.
+
+    Returns three ``client_id -> id`` maps, for questions, context items and
+    options, covering payload items that sent a ``client_id`` so the builder
+    can remember the ids of newly created rows.
+    """
+    existing = {
+        question.id: question
+        for question in survey.questions.select_related('true_false_answer').prefetch_related(
+            'options', 'enumeration_answers', 'context_items'
+        )
+    }
+    matched_ids = set()
+    now = timezone.now()
+    questions = _ChangeSet(Question, QUESTION_FIELDS + ['updated_at'])
+    plan = []  # (question, q_data or None for nested text elements)
+    client_ids = []  # (client_id, question)
+
+    def match(q_id, values):
+        try:
+            question = existing.get(int(q_id)) if q_id else None
+        except (TypeError, ValueError):
+            question = None
+        if question is None or question.id in matched_ids:
+            question = Question(survey=survey, **values)
+            questions.to_create.append(question)
+            return question
+        matched_ids.add(question.id)
+        if questions.assign(question, values):
+            question.updated_at = now
+        return question
+
+    for idx, q_data in enumerate(questions_data):
+        q_type = q_data.get('type') or q_data.get('question_type')
+        q_text = q_data.get('text') or q_data.get('question_text') or ''
+        if not q_type:
+            logger.warning(f"Question {idx} has no type, skipping")
+            continue
+
+        question = match(q_data.get('id'), _question_values(q_type, q_text, idx, q_data))
+        plan.append((question, q_data))
+        if q_data.get('client_id'):
+            client_ids.append((q_data['client_id'], question))
+
+        # Nested subheadings/paragraphs are stored as separate rows sharing the heading's order
+        if q_type == 'heading':
+            for nested_item in q_data.get('nested_items') or []:
+                nested_type = nested_item.get('type')
+                if nested_type not in ('subheading', 'paragraph'):
+                    continue
+                nested = match(
+                    nested_item.get('id'),
+                    _question_values(nested_type, nested_item.get('text', ''), idx, nested_item),
+                )
+                plan.append((nested, None))
+                if nested_item.get('client_id'):
+                    client_ids.append((nested_item['client_id'], nested))
+
+    questions.to_delete = [q_id for q_id in existing if q_id not in matched_ids]
+
+    options = _ChangeSet(MultipleChoiceOption, ['option_text', 'is_correct', 'order'])
+    enumeration_answers = _ChangeSet(EnumerationAnswer, ['answer_text', 'order'])
+    true_false_answers = _ChangeSet(TrueFalseAnswer, ['is_true'])
+    context_items = _ChangeSet(QuestionContext, ['context_type', 'content', 'language', 'order'])
+    context_client_ids = []  # (client_id, context item)
+    option_client_ids = []  # (client_id, option)
+
+    with transaction.atomic():
+        questions.flush()
+
+        for question, q_data in plan:
+            desired_options, desired_answers, desired_true_false, desired_context = _desired_children(question, q_data)
+            is_new = question.id not in matched_ids
+            option_rows = _sync_by_id(options, question, [] if is_new else list(question.options.all()), desired_options)
+            option_client_ids.extend(
+                (client_id, row) for client_id, row in zip(_option_client_ids(question, q_data), option_rows) if client_id
+            )
+            _sync_list(enumeration_answers, question, [] if is_new else list(question.enumeration_answers.all()), desired_answers)
+            context_rows = _sync_list(context_items, question, [] if is_new else list(question.context_items.all()), desired_context)
+            context_client_ids.extend(
+                (client_id, row) for client_id, row in zip(_context_client_ids(q_data), context_rows) if client_id
+            )
+
+            current_true_false = None if is_new else getattr(question, 'true_false_answer', None)
+            if desired_true_false is None:
+                if current_true_false is not None:
+                    true_false_answers.to_delete.append(current_true_false.id)
+            elif current_true_false is None:
+                true_false_answers.to_create.append(TrueFalseAnswer(question=question, is_true=desired_true_false))
+            else:
+                true_false_answers.assign(current_true_false, {'is_true': desired_true_false})
+
+        for changes in (options, enumeration_answers, true_false_answers, context_items):
+            changes.flush()
+
+    return (
+        {client_id: question.id for client_id, question in client_ids},
+        {client_id: row.id for client_id, row in context_client_ids},
+        {client_id: row.id for client_id, row in option_client_ids},
+    )
+
+
+class SurveyOperationError(ValueError):
+    """Raised when a builder operation is malformed or targets a foreign object."""
+
+
+class SurveyRevisionConflict(Exception):
+    """Raised when operations were based on an outdated survey revision."""
+
+    def __init__(self, revision):
+        super().__init__(f'Survey has changed (current revision {revision})')
+        self.revision = revision
+
+
+def _int_id(value, field):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise SurveyOperationError(f'Invalid {field}: {value!r}')
+
+
+def apply_survey_operations(survey, base_revision, operations):
+    """Apply a small list of builder edits in one transaction.
+
+    Supported operations::
+
+        {"op": "set_text", "question_id": 1, "text": "..."}
+        {"op": "reorder", "question_ids": [3, 1, 2]}
+        {"op": "add_option", "question_id": 1, "text": "...", "is_correct": false}
+        {"op": "delete_context", "context_id": 7}
+
+    ``base_revision`` must match the survey's current revision, otherwise
+    ``SurveyRevisionConflict`` is raised and nothing is written. Returns the
+    new revision and the ids of any options created.
+    """
+    if not isinstance(operations, list):
+        raise SurveyOperationError('operations must be a list')
+
+    text_updates = {}
+    reorder_ids = None
+    new_options = []
+    context_ids = []
+    for operation in operations:
+        if not isinstance(operation, dict):
+            raise SurveyOperationError('Each operation must be an object')
+        op = operation.get('op')
+        if op == 'set_text':
+            text_updates[_int_id(operation.get('question_id'), 'question_id')] = str(operation.get('text') or '')
+        elif op == 'reorder':
+            ids = operation.get('question_ids')
+            if not isinstance(ids, list):
+                raise SurveyOperationError('reorder needs a question_ids list')
+            reorder_ids = [_int_id(q_id, 'question_id') for q_id in ids]
+        elif op == 'add_option':
+            new_options.append((
+                _int_id(operation.get('question_id'), 'question_id'),
+                str(operation.get('text') or ''),
+                bool(operation.get('is_correct')),
+            ))
+        elif op == 'delete_context':
+            context_ids.append(_int_id(operation.get('context_id'), 'context_id'))
+        else:
+            raise SurveyOperationError(f'Unknown operation: {op!r}')
+
+    with transaction.atomic():
+        # Optimistic lock: only one writer can move the survey past base_revision
+        bumped = Survey.objects.filter(pk=survey.pk, revision=base_revision).update(
+            revision=F('revision') + 1, updated_at=timezone.now()
+        )
+        if not bumped:
+            raise SurveyRevisionConflict(
+                Survey.objects.filter(pk=survey.pk).values_list('revision', flat=True).first()
+            )
+
+        touched_ids = set(text_updates) | {q_id for q_id, _, _ in new_options}
+        if reorder_ids is not None or touched_ids:
+            questions = {q.id: q for q in Question.objects.filter(survey=survey).only('id', 'question_type', 'order')}
+        else:
+            questions = {}
+        unknown = touched_ids - set(questions)
+        if reorder_ids is not None:
+            unknown |= set(reorder_ids) - set(questions)
+        if unknown:
+            raise SurveyOperationError(f'Unknown question ids: {sorted(unknown)}')
+
+        now = timezone.now()
+        changed = {}
+        for q_id, text in text_updates.items():
+            question = questions[q_id]
+            question.question_text = text
+            changed[q_id] = question
+
+        if reorder_ids is not None:
+            # Nested subheadings/paragraphs are not listed; they share their
+            # heading's order and move with it
+            listed = set(reorder_ids)
+            followers = {}
+            for question in questions.values():
+                if question.id not in listed:
+                    followers.setdefault(question.order, []).append(question)
+            for idx, q_id in enumerate(reorder_ids):
+                question = questions[q_id]
+                for follower in followers.pop(question.order, []):
+                    follower.order = idx
+                    changed[follower.id] = follower
+                question.order = idx
+                changed[q_id] = question
+
+        for question in changed.values():
+            question.updated_at = now
+        if changed:
+            fields = ['updated_at']
+            if text_updates:
+                fields.append('question_text')
+            if reorder_ids is not None:
+                fields.append('order')
+            Question.objects.bulk_update(list(changed.values()), fields)
+
+        created_options = []
+        if new_options:
+            for q_id, _, _ in new_options:
+                if questions[q_id].question_type not in CHOICE_TYPES:
+                    raise SurveyOperationError(f'Question {q_id} does not take options')
+            next_order = dict(
+                MultipleChoiceOption.objects.filter(question_id__in={q_id for q_id, _, _ in new_options})
+                .values('question_id').annotate(total=Count('id')).values_list('question_id', 'total')
+            )
+            for q_id, text, is_correct in new_options:
+                order = next_order.get(q_id, 0)
+                next_order[q_id] = order + 1
+                created_options.append(MultipleChoiceOption(
+                    question_id=q_id,
+                    option_text=text,
+                    is_correct=is_correct if questions[q_id].question_type == 'multiple_choice' else False,
+                    order=order,
+                ))
+            MultipleChoiceOption.objects.bulk_create(created_options)
+
+        if context_ids:
+            QuestionContext.objects.filter(id__in=context_ids, question__survey=survey).delete()
+
+    return base_revision + 1, [option.id for option in created_options]
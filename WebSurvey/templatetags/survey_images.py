@@ -0,0 +1,18 @@
+from django import template
+
+from ..images import image_srcset as build_image_srcset
+from ..images import image_url as build_image_url
+
+register = template.Library()
+
+
+@register.filter
+def image_url(content):
+    """``src`` of a stored context image."""
+    return build_image_url(content)
+
+
+@register.filter
+def image_srcset(content):
+    """``srcset`` value listing the resized variants of a context image."""
+    return build_image_srcset(content)
@@ -1,3 +1,605 @@
-from django.test import TestCase
+import base64
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from itertools import product
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .analytics import get_analytics_version, rebuild_answer_counts
+from .export_jobs import claim_next_job
+from .models import (
+    AnswerCount,
+    EnumerationAnswer,
+    MultipleChoiceOption,
+    Question,
+    QuestionAnswer,
+    QuestionContext,
+    Section,
+    StudentImportJob,
+    StudentResponse,
+    Survey,
+    TrueFalseAnswer,
+    User,
+)
+from .search import SEARCH_TABLE, reindex_responses
+from .serializers import serialize_survey
+from .snapshots import get_survey_snapshot
+from .student_import import enqueue_import, expire_stale_imports, parse_student_csv, run_import_job
+from .student_summary import STUDENT_SUMMARY_TIMEOUT, get_student_summary
+from .survey_sync import sync_survey_questions
+
+QUESTION_TYPES = ['multiple_choice', 'true_false', 'essay', 'enumeration', 'likert']
+QUESTION_COUNTS = (10, 100, 500)
+RESPONSE_COUNTS = (10, 1000)
+BATCH_SIZE = 5000
+
+
+def seed_survey(teacher, section, question_count, students):
+    """Create a published survey with ``question_count`` questions answered by every student in ``students``.
+
+    Everything is written with bulk_create so the large fixtures stay quick to build.
+    """
+    survey = Survey.objects.create(
+        title=f'Survey {question_count}x{len(students)}',
+        teacher=teacher,
+        status='published',
+    )
+    survey.sections.add(section)
+    questions = Question.objects.bulk_create([
+        Question(
+            survey=survey,
+            question_type=QUESTION_TYPES[index % len(QUESTION_TYPES)],
+            question_text=f'Question {index}',
+            order=index,
+        )
+        for index in range(question_count)
+    ])
+    options = MultipleChoiceOption.objects.bulk_create([
+        MultipleChoiceOption(question=question, option_text=f'Option {order}', order=order, is_correct=order == 0)
+        for question in questions
+        if question.question_type in ('multiple_choice', 'likert')
+        for order in range(4)
+    ], batch_size=BATCH_SIZE)
+    TrueFalseAnswer.objects.bulk_create([
+        TrueFalseAnswer(question=question, is_true=True)
+        for question in questions
+        if question.question_type == 'true_false'
+    ])
+    EnumerationAnswer.objects.bulk_create([
+        EnumerationAnswer(question=question, answer_text=f'Answer {order}', order=order)
+        for question in questions
+        if question.question_type == 'enumeration'
+        for order in range(2)
+    ])
+
+    first_option = {}
+    for option in options:
+        first_option.setdefault(option.question_id, option.id)
+    now = timezone.now()
+    responses = StudentResponse.objects.bulk_create([
+        StudentResponse(survey=survey, student=student, is_submitted=True, submitted_at=now)
+        for student in students
+    ], batch_size=BATCH_SIZE)
+    QuestionAnswer.objects.bulk_create([
+        QuestionAnswer(
+            response=response,
+            question=question,
+            selected_option_id=first_option.get(question.id),
+            true_false_answer=True if question.question_type == 'true_false' else None,
+            text_answer='some answer text' if question.question_type in ('essay', 'enumeration') else '',
+        )
+        for response in responses
+        for question in questions
+    ], batch_size=BATCH_SIZE)
+    return survey
+
+
+def png_bytes(width=10, height=10):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def answer_post_data(survey, action='submit'):
+    """take_survey form data answering every question of ``survey``."""
+    data = {'action': action}
+    questions = survey.questions.prefetch_related('options')
+    for question in questions:
+        field_name = f'question_{question.id}'
+        if question.question_type in ('multiple_choice', 'likert'):
+            data[field_name] = str(question.options.all()[0].id)
+        elif question.question_type == 'true_false':
+            data[field_name] = 'true'
+        else:
+            data[field_name] = 'an answer'
+    return data
+
+
+def save_survey_payload(survey):
+    """Builder payload for ``survey`` with every question's text edited, based on its current revision."""
+    payload = serialize_survey(survey)
+    for question in payload['questions']:
+        question['text'] += ' (edited)'
+    payload['base_revision'] = survey.revision
+    return json.dumps(payload)
+
+
+class ViewQueryCountTests(TestCase):
+    """Each view runs the same number of queries whatever the survey size.
+
+    Surveys with 10/100/500 questions and 10/1000 submitted responses are
+    seeded, each owned by its own teacher and assigned to its own section so
+    every page shows exactly one survey. A view whose query count changes
+    with size has an N+1 problem.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        students = User.objects.bulk_create([
+            User(username=f'responder{index}', role='student', password='!')
+            for index in range(max(RESPONSE_COUNTS))
+        ], batch_size=BATCH_SIZE)
+        cls.fixtures = {}
+        for question_count, response_count in product(QUESTION_COUNTS, RESPONSE_COUNTS):
+            size = f'{question_count}q-{response_count}r'
+            teacher = User.objects.create(username=f'teacher-{size}', role='teacher')
+            section = Section.objects.create(name=f'Section {size}', teacher=teacher)
+            student = User.objects.create(username=f'student-{size}', role='student', section=section)
+            survey = seed_survey(teacher, section, question_count, students[:response_count])
+            cls.fixtures[question_count, response_count] = (teacher, student, survey)
+        rebuild_answer_counts()
+
+    def assertConstantQueries(self, num, user, request, payload=None):
+        """``request(client, survey, data)`` issues exactly ``num`` queries for every fixture size.
+
+        ``data`` is ``payload(survey)``, built before counting starts. ``num``
+        may instead map question counts to query counts: SQLite binds at most
+        999 parameters per statement, so Django splits the bulk writes for the
+        500-question survey into a few more statements. That grows with
+        rows / 999, not per row.
+        """
+        for (question_count, response_count), (teacher, student, survey) in self.fixtures.items():
+            with self.subTest(questions=question_count, responses=response_count):
+                # Cold caches, so every size pays for the same cache misses
+                cache.clear()
+                self.client.force_login(teacher if user == 'teacher' else student)
+                data = payload(survey) if payload else None
+                expected = num[question_count] if isinstance(num, dict) else num
+                # Also keeps settings.QUERY_BUDGETS in line with the measured counts
+                with self.assertNumQueries(expected), self.assertNoLogs('WebSurvey.middleware', 'WARNING'):
+                    response = request(self.client, survey, data)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertLess(response.status_code, 400)
+
+    def test_teacher_dashboard(self):
+        self.assertConstantQueries(8, 'teacher', lambda client, survey, data: client.get(reverse('dashboard')))
+
+    def test_student_dashboard(self):
+        self.assertConstantQueries(7, 'student', lambda client, survey, data: client.get(reverse('dashboard')))
+
+    def test_take_survey_get(self):
+        self.assertConstantQueries(
+            11, 'student', lambda client, survey, data: client.get(reverse('take_survey', args=[survey.id]))
+        )
+
+    def test_take_survey_post(self):
+        self.assertConstantQueries(
+            {10: 30, 100: 30, 500: 35},
+            'student',
+            lambda client, survey, data: client.post(reverse('take_survey', args=[survey.id]), data),
+            payload=answer_post_data,
+        )
+
+    def test_save_survey(self):
+        self.assertConstantQueries(
+            {10: 23, 100: 23, 500: 27},
+            'teacher',
+            lambda client, survey, data: client.post(reverse('save_survey'), data, content_type='application/json'),
+            payload=save_survey_payload,
+        )
+
+    def test_get_survey_data(self):
+        self.assertConstantQueries(
+            9, 'teacher', lambda client, survey, data: client.get(reverse('get_survey_data', args=[survey.id]))
+        )
+
+    def test_duplicate_survey(self):
+        self.assertConstantQueries(
+            {10: 17, 100: 17, 500: 24},
+            'teacher',
+            lambda client, survey, data: client.post(reverse('duplicate_survey', args=[survey.id])),
+        )
+
+    def test_survey_analytics(self):
+        self.assertConstantQueries(
+            9, 'teacher', lambda client, survey, data: client.get(reverse('survey_analytics', args=[survey.id]))
+        )
+
+    def test_survey_analytics_data(self):
+        self.assertConstantQueries(
+            9, 'teacher', lambda client, survey, data: client.get(reverse('survey_analytics_data', args=[survey.id]))
+        )
+
+    def test_response_management(self):
+        self.assertConstantQueries(
+            7, 'teacher', lambda client, survey, data: client.get(reverse('response_management'))
+        )
+
+    def test_student_available_surveys(self):
+        self.assertConstantQueries(
+            7, 'student', lambda client, survey, data: client.get(reverse('student_available_surveys'))
+        )
+
+
+class SurveySyncTests(TestCase):
+    """Saving the builder payload keeps option rows tied to their text."""
+
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher', role='teacher')
+        self.survey = Survey.objects.create(title='Survey', teacher=self.teacher, status='published')
+        question = Question.objects.create(survey=self.survey, question_type='multiple_choice', question_text='Pick')
+        self.options = MultipleChoiceOption.objects.bulk_create([
+            MultipleChoiceOption(question=question, option_text=text, order=order)
+            for order, text in enumerate('ABC')
+        ])
+
+    def test_removing_an_option_keeps_the_others(self):
+        payload = serialize_survey(self.survey)
+        payload['questions'][0]['options'].pop(0)
+        sync_survey_questions(self.survey, payload['questions'])
+
+        remaining = dict(MultipleChoiceOption.objects.values_list('id', 'option_text'))
+        self.assertEqual(remaining, {self.options[1].id: 'B', self.options[2].id: 'C'})
+
+    def test_new_options_report_their_ids(self):
+        payload = serialize_survey(self.survey)
+        payload['questions'][0]['options'].insert(0, {'client_id': 'option-1', 'text': 'Z'})
+        _, _, option_ids = sync_survey_questions(self.survey, payload['questions'])
+
+        self.assertEqual(MultipleChoiceOption.objects.get(id=option_ids['option-1']).option_text, 'Z')
+        self.assertEqual(MultipleChoiceOption.objects.get(id=self.options[0].id).option_text, 'A')
+
+
+@override_settings(MEDIA_ROOT=Path(tempfile.mkdtemp()))
+class ContextImageTests(TestCase):
+    """Context images are stored as blob names and turned into URLs when rendered."""
+
+    def test_image_round_trip(self):
+        teacher = User.objects.create(username='teacher', role='teacher')
+        survey = Survey.objects.create(title='Survey', teacher=teacher)
+        question = Question.objects.create(survey=survey, question_type='essay', question_text='Describe')
+        image = png_bytes()
+        payload = serialize_survey(survey)
+        payload['questions'][0]['context_items'] = [
+            {'type': 'image', 'content': 'data:image/png;base64,' + base64.b64encode(image).decode()},
+        ]
+        sync_survey_questions(survey, payload['questions'])
+        context = QuestionContext.objects.get(question=question)
+
+        self.assertEqual(context.content, f'{hashlib.sha256(image).hexdigest()}.png')
+        # The builder gets a URL and sends it back unchanged on the next save
+        payload = serialize_survey(survey)
+        self.assertEqual(payload['questions'][0]['context_items'][0]['content'], reverse('blob', args=[context.content]))
+        sync_survey_questions(survey, payload['questions'])
+        self.assertEqual(QuestionContext.objects.get(question=question).content, context.content)
+
+    def test_upload_must_decode_as_an_image(self):
+        self.client.force_login(User.objects.create(username='teacher', role='teacher'))
+        url = reverse('upload_blob')
+
+        # The declared type is ignored: a real PNG is stored as one whatever the client says
+        response = self.client.post(url, {'file': SimpleUploadedFile('a.jpg', png_bytes(), content_type='image/jpeg')})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['url'].endswith('.png'))
+        response = self.client.post(url, {'file': SimpleUploadedFile('a.png', b'<svg/>', content_type='image/png')})
+        self.assertEqual(response.status_code, 400)
+
+
+class ConcurrentSubmitTests(TestCase):
+    """A submission racing another one for the same response is only counted once."""
+
+    def setUp(self):
+        teacher = User.objects.create(username='teacher', role='teacher')
+        section = Section.objects.create(name='Section', teacher=teacher)
+        self.student = User.objects.create(username='student', role='student', section=section)
+        self.survey = seed_survey(teacher, section, 5, [])
+        self.client.force_login(self.student)
+
+    def test_submission_that_lands_first_wins(self):
+        data = answer_post_data(self.survey)
+        url = reverse('take_survey', args=[self.survey.id])
+        self.client.post(url, {**data, 'action': 'draft'})
+
+        def submitted_meanwhile(survey):
+            # The other request submits after this one passed the is_submitted check
+            StudentResponse.objects.filter(survey=survey).update(is_submitted=True, submitted_at=timezone.now())
+            return get_survey_snapshot(survey)
+
+        with mock.patch('WebSurvey.views.get_survey_snapshot', side_effect=submitted_meanwhile):
+            response = self.client.post(url, data)
+
+        self.assertRedirects(response, reverse('student_completed_surveys'), fetch_redirect_response=False)
+        self.assertFalse(AnswerCount.objects.filter(survey=self.survey, count__gt=0).exists())
+
+
+class StudentSummaryTests(TestCase):
+    """Cached summaries expire, so changes signalled in another process are picked up."""
+
+    def test_summary_is_rebuilt_after_the_timeout(self):
+        teacher = User.objects.create(username='teacher', role='teacher')
+        section = Section.objects.create(name='Section', teacher=teacher)
+        student = User.objects.create(username='student', role='student', section=section)
+        survey = seed_survey(teacher, section, 1, [])
+        self.assertEqual(get_student_summary(student)['entries'][0]['status'], 'published')
+
+        # A bulk update sends no signals, like a change made through another worker process
+        Survey.objects.filter(id=survey.id).update(status='closed')
+        self.assertEqual(get_student_summary(student)['entries'][0]['status'], 'published')
+        later = time.time() + STUDENT_SUMMARY_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertEqual(get_student_summary(student)['entries'][0]['status'], 'closed')
+
+
+class AnalyticsVersionTests(TestCase):
+    """The analytics version comes from the database, so every process agrees on it."""
+
+    def setUp(self):
+        teacher = User.objects.create(username='teacher', role='teacher')
+        section = Section.objects.create(name='Section', teacher=teacher)
+        self.student = User.objects.create(username='student', role='student', section=section)
+        self.survey = seed_survey(teacher, section, 5, [])
+
+    def test_version_survives_a_cold_cache(self):
+        version = get_analytics_version(self.survey.id)
+        cache.clear()
+
+        self.assertEqual(get_analytics_version(self.survey.id), version)
+
+    def test_version_changes_on_submission_and_edit(self):
+        version = get_analytics_version(self.survey.id)
+        self.client.force_login(self.student)
+        self.client.post(reverse('take_survey', args=[self.survey.id]), answer_post_data(self.survey))
+        submitted = get_analytics_version(self.survey.id)
+        Survey.objects.filter(id=self.survey.id).update(revision=F('revision') + 1)
+
+        self.assertNotEqual(submitted, version)
+        self.assertNotEqual(get_analytics_version(self.survey.id), submitted)
+
+    def test_unchanged_analytics_answer_304_at_once(self):
+        self.client.force_login(self.survey.teacher)
+        url = reverse('survey_analytics_data', args=[self.survey.id])
+        etag = self.client.get(url)['ETag']
+
+        # Session, user, survey and version; no analytics are computed
+        with self.assertNumQueries(4):
+            response = self.client.get(url, headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+
+
+class SearchIndexTests(TestCase):
+    """Only submitted responses are written to the full-text search index."""
+
+    def setUp(self):
+        teacher = User.objects.create(username='teacher', role='teacher')
+        section = Section.objects.create(name='Section', teacher=teacher)
+        self.student = User.objects.create(username='student', role='student', section=section, first_name='Ada')
+        self.survey = seed_survey(teacher, section, 5, [])
+        self.client.force_login(self.student)
+        # Filtered totals are cached by their SQL, which repeats across tests
+        cache.clear()
+
+    def test_drafts_leave_the_index_alone(self):
+        data = answer_post_data(self.survey, action='draft')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('take_survey', args=[self.survey.id]), data)
+
+        self.assertFalse([query for query in queries if SEARCH_TABLE in query['sql']])
+
+    def test_submitted_response_is_searchable(self):
+        self.client.post(reverse('take_survey', args=[self.survey.id]), answer_post_data(self.survey))
+        self.client.force_login(self.survey.teacher)
+
+        found = self.client.get(reverse('response_management'), {'search': 'ada'})
+        missed = self.client.get(reverse('response_management'), {'search': 'grace'})
+
+        self.assertEqual((found.context['total_responses'], missed.context['total_responses']), (1, 0))
+
+    def test_results_are_ordered_by_relevance(self):
+        teacher = self.survey.teacher
+        best = User.objects.create(username='best', role='student', first_name='Ada', last_name='Ada')
+        other = seed_survey(teacher, self.student.section, 1, [best])
+        reindex_responses(survey_id=other.id)
+        # The weaker match was submitted last, so date order would put it first
+        self.client.post(reverse('take_survey', args=[self.survey.id]), answer_post_data(self.survey))
+        self.client.force_login(teacher)
+        url = reverse('response_management')
+
+        first = self.client.get(url, {'search': 'ada'}).context['page_obj']
+        self.assertEqual([response.student for response in first], [best, self.student])
+        self.assertEqual(first[0].survey, other)
+        with mock.patch('WebSurvey.views.RESPONSES_PER_PAGE', 1):
+            page = self.client.get(url, {'search': 'ada'}).context['page_obj']
+            page = self.client.get(url, {'search': 'ada', 'after': page.next_cursor}).context['page_obj']
+        self.assertEqual([response.student for response in page], [self.student])
+
+
+class AnswerCountRetractionTests(TestCase):
+    """Answer counters drop a submission that is reverted or deleted."""
+
+    def setUp(self):
+        teacher = User.objects.create(username='teacher', role='teacher')
+        section = Section.objects.create(name='Section', teacher=teacher)
+        self.students = User.objects.bulk_create([
+            User(username=f'student{index}', role='student', section=section) for index in range(3)
+        ])
+        self.survey = seed_survey(teacher, section, 5, self.students)
+        rebuild_answer_counts()
+
+    def counts(self):
+        return sorted(AnswerCount.objects.filter(survey=self.survey).values_list('count', flat=True))
+
+    def test_reverted_submission_is_retracted(self):
+        response = StudentResponse.objects.filter(survey=self.survey).first()
+        response.is_submitted = False
+        response.save()
+
+        self.assertEqual(set(self.counts()), {2})
+
+    def counter_updates(self, delete):
+        with CaptureQueriesContext(connection) as queries:
+            delete()
+        return [query for query in queries if query['sql'].startswith('UPDATE "WebSurvey_answercount"')]
+
+    def test_deleting_a_student_retracts_in_one_batch(self):
+        updates = self.counter_updates(lambda: self.students[0].delete())
+
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(set(self.counts()), {2})
+
+    def test_bulk_delete_retracts_every_response(self):
+        # One student answers false, so counters drop by different amounts
+        QuestionAnswer.objects.filter(response__student=self.students[0], true_false_answer=True).update(
+            true_false_answer=False
+        )
+        rebuild_answer_counts()
+        updates = self.counter_updates(lambda: StudentResponse.objects.filter(survey=self.survey).delete())
+
+        # One UPDATE per decrement size: 3 (total and options), 2 (true) and 1 (false)
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(set(self.counts()), {0})
+
+    def test_deleting_the_survey_skips_retraction(self):
+        self.assertEqual(self.counter_updates(self.survey.delete), [])
+        self.assertFalse(AnswerCount.objects.exists())
+
+
+class ExportTests(TestCase):
+    """CSV exports never hand a spreadsheet a formula typed by a student."""
+
+    def test_formula_answers_are_exported_as_text(self):
+        teacher = User.objects.create(username='teacher', role='teacher')
+        section = Section.objects.create(name='Section', teacher=teacher)
+        student = User.objects.create(username='student', role='student', first_name='@SUM(A1)')
+        survey = seed_survey(teacher, section, 3, [student])
+        QuestionAnswer.objects.filter(question__question_type='essay').update(text_answer='=HYPERLINK("http://x")')
+        self.client.force_login(teacher)
+
+        response = self.client.get(reverse('export_survey_responses', args=[survey.id]))
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+
+        self.assertIn('"\'=HYPERLINK(""http://x"")"', content)
+        self.assertIn("'@SUM(A1)", content)
+        self.assertNotIn(',=HYPERLINK', content)
+
+
+class SaveSurveyConflictTests(TestCase):
+    """save_survey refuses a full save based on an outdated revision."""
+
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher', role='teacher')
+        self.survey = Survey.objects.create(title='Survey', teacher=self.teacher, revision=3)
+        self.client.force_login(self.teacher)
+
+    def save(self, base_revision):
+        payload = {**serialize_survey(self.survey), 'title': 'Edited', 'base_revision': base_revision}
+        return self.client.post(reverse('save_survey'), json.dumps(payload), content_type='application/json')
+
+    def test_stale_save_is_rejected(self):
+        response = self.save(2)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['revision'], 3)
+        self.survey.refresh_from_db()
+        self.assertEqual((self.survey.title, self.survey.revision), ('Survey', 3))
+
+    def test_current_save_bumps_the_revision(self):
+        response = self.save(3)
+
+        self.assertEqual(response.json()['revision'], 4)
+        self.survey.refresh_from_db()
+        self.assertEqual((self.survey.title, self.survey.revision), ('Edited', 4))
+
+
+class DuplicateSurveyTests(TestCase):
+    """duplicate_survey rejects a malformed section selection instead of failing with a 500."""
+
+    def test_non_integer_section_ids_are_a_bad_request(self):
+        teacher = User.objects.create(username='teacher', role='teacher')
+        survey = Survey.objects.create(title='Survey', teacher=teacher)
+        self.client.force_login(teacher)
+        url = reverse('duplicate_survey', args=[survey.id])
+
+        for body in ({'section_ids': ['abc']}, {'section_ids': 'abc'}, ['abc']):
+            with self.subTest(body=body):
+                response = self.client.post(url, json.dumps(body), content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(Survey.objects.count(), 1)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class StudentImportJobTests(TestCase):
+    """The import view only validates and queues; the worker creates the accounts."""
+
+    def setUp(self):
+        staging_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, staging_root)
+        self.enterContext(override_settings(IMPORT_STAGING_ROOT=staging_root))
+
+    def staged_files(self):
+        return os.listdir(settings.IMPORT_STAGING_ROOT)
+
+    def test_import_is_queued_then_run(self):
+        teacher = User.objects.create(username='teacher', role='teacher')
+        section = Section.objects.create(name='Section', teacher=teacher)
+        self.client.force_login(teacher)
+        upload = SimpleUploadedFile('students.csv', b'username,password\nann,password1\nbob,password2\n')
+
+        response = self.client.post(reverse('import_section_students', args=[section.id]), {'file': upload})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(User.objects.filter(role='student').exists())
+        # The passwords wait in an owner-only file, not in the database
+        (name,) = self.staged_files()
+        self.assertEqual(os.stat(os.path.join(settings.IMPORT_STAGING_ROOT, name)).st_mode & 0o777, 0o600)
+        job_id = response.json()['job_id']
+        self.assertEqual(StudentImportJob.objects.get(id=job_id).rows_file, name)
+        self.assertEqual(claim_next_job(StudentImportJob), job_id)
+        self.assertEqual(run_import_job(job_id), 'done')
+
+        job = self.client.get(response.json()['status_url']).json()['job']
+        self.assertEqual((job['status'], job['created']), ('done', 2))
+        self.assertEqual(self.staged_files(), [])
+        self.assertEqual(set(section.students.values_list('username', flat=True)), {'ann', 'bob'})
+
+    def test_unstarted_import_expires(self):
+        teacher = User.objects.create(username='teacher', role='teacher')
+        section = Section.objects.create(name='Section', teacher=teacher)
+        rows, _ = parse_student_csv('username,password\nann,password1\n')
+        job = enqueue_import(teacher, section, rows)
+        StudentImportJob.objects.filter(id=job.id).update(
+            created_at=timezone.now() - timedelta(seconds=settings.IMPORT_STAGING_TIMEOUT + 1)
+        )
+
+        expire_stale_imports()
+
+        self.assertEqual(StudentImportJob.objects.get(id=job.id).status, 'failed')
+        self.assertEqual(self.staged_files(), [])
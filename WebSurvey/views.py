@@ -2,141 +2,272 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.db import transaction
+from django.urls import reverse
 from django.utils import timezone
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.db.models import F, Q, Count, Exists, FloatField, OuterRef, Subquery, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_save
 import json
 import logging
-from collections import Counter
 from django.views.decorators.csrf import csrf_exempt
 from .models import (
     User,
     Section,
     Survey,
-    Question,
-    MultipleChoiceOption,
-    TrueFalseAnswer,
-    EnumerationAnswer,
-    QuestionContext,
     StudentResponse,
     QuestionAnswer,
+    AnswerCount,
+    ExportJob,
+    StudentImportJob,
+)
+from .analytics import (
+    get_analytics_version,
+    get_survey_analytics,
+    record_submission,
+)
+from .blobs import MAX_BLOB_SIZE, blob_content_type, blob_url, open_blob
+from .cloning import clone_survey
+from .export_jobs import enqueue_export, get_export_storage, job_status
+from .exports import EXPORT_FORMATS, export_filename, iter_export
+from .images import store_image
+from .instrumentation import METRICS_WINDOW, metrics_snapshot
+from .serializers import STREAM_QUESTION_THRESHOLD, iter_survey_json, load_survey_tree, serialize_survey
+from .services import close_due_surveys_if_needed, parse_due_date
+from .pagination import cached_count, keyset_paginate
+from .search import search_rank_sql, search_sql
+from .snapshots import get_survey_snapshot
+from .student_import import (
+    MAX_IMPORT_FILE_SIZE,
+    enqueue_import,
+    expire_stale_imports,
+    import_status,
+    parse_student_csv,
+)
+from .student_summary import get_student_summary
+from .survey_sync import (
+    SurveyOperationError,
+    SurveyRevisionConflict,
+    apply_survey_operations,
+    sync_survey_questions,
 )
-from .services import auto_close_due_surveys, parse_due_date
 
 logger = logging.getLogger(__name__)
 
 # Create your views here.
 
 
+STUDENT_SURVEYS_PER_PAGE = 9
+RESPONSES_PER_PAGE = 10
+ANALYTICS_SURVEYS_PER_PAGE = 10
+SURVEY_CONFLICT_MESSAGE = 'This survey was changed in another tab or window since you last saved.'
+
+
 def _get_student_survey_data(user):
-    """Return collections used by student survey pages."""
-    auto_close_due_surveys()
-    section = user.section
-    now = timezone.now()
+    """Return counts and survey entry lists used by student survey pages.
 
-    available_surveys = []
-    pending_responses = []
-    completed_responses = []
-    responses_map = {}
-
-    if section:
-        base_surveys = (
-            Survey.objects.filter(sections=section, status__in=['published', 'closed'])
-            .select_related('teacher')
-            .prefetch_related('questions')
-            .distinct()
-        )
-        responses_qs = (
-            StudentResponse.objects.filter(
-                student=user,
-                survey__sections=section,
-                survey__status__in=['published', 'closed']
-            )
-            .select_related('survey', 'survey__teacher')
-            .prefetch_related('survey__questions')
-            .distinct()
-        )
+    Built from the cached per-student summary, so no survey rows are loaded;
+    use ``_student_surveys_page``/``_student_responses_page`` to render a page.
+    """
+    summary = get_student_summary(user)
+    now = timezone.now()
 
-        for response in responses_qs:
-            responses_map[response.survey_id] = response
-            if response.is_submitted:
-                completed_responses.append(response)
-            else:
-                pending_responses.append(response)
+    available_entries = []
+    pending_entries = []
+    completed_entries = []
 
-        for survey in base_surveys:
-            # Set status flags first
-            survey.is_overdue = bool(survey.due_date and survey.due_date < now)
-            survey.is_closed = survey.status == 'closed'
-            
-            response = responses_map.get(survey.id)
-            if response and response.is_submitted:
-                continue
-            survey.student_response = response
-            survey.is_draft = bool(response and not response.is_submitted)
-            available_surveys.append(survey)
-
-    for response in pending_responses:
-        survey = response.survey
-        survey.is_overdue = bool(survey.due_date and survey.due_date < now)
-        survey.is_closed = survey.status == 'closed'
-        response.is_overdue = survey.is_overdue
-        response.is_closed = survey.is_closed
-
-    available_active_count = sum(1 for survey in available_surveys if not survey.is_overdue and not survey.is_closed)
+    for entry in summary['entries']:
+        entry = dict(
+            entry,
+            is_overdue=bool(entry['due_date'] and entry['due_date'] < now),
+            is_closed=entry['status'] == 'closed',
+            is_draft=bool(entry['response_id'] and not entry['is_submitted']),
+        )
+        if entry['is_submitted']:
+            completed_entries.append(entry)
+            continue
+        available_entries.append(entry)
+        if entry['is_draft']:
+            pending_entries.append(entry)
+
+    available_active_count = sum(1 for entry in available_entries if not entry['is_overdue'] and not entry['is_closed'])
     # Count only pending responses that are not closed
-    pending_active_count = sum(1 for response in pending_responses if not response.is_overdue and not response.is_closed)
+    pending_active_count = sum(1 for entry in pending_entries if not entry['is_overdue'] and not entry['is_closed'])
 
     context = {
-        'student_section': section,
-        'available_surveys': available_surveys,
-        'pending_responses': pending_responses,
-        'completed_responses': completed_responses,
+        'student_section': user.section if summary['section_id'] else None,
+        'available_entries': available_entries,
+        'pending_entries': pending_entries,
+        'completed_entries': completed_entries,
         'available_survey_count': available_active_count,
         'pending_survey_count': pending_active_count,
-        'completed_survey_count': len(completed_responses),
+        'completed_survey_count': len(completed_entries),
         'current_time': now,
     }
     return context
 
 
-def _save_student_answers(response, survey, post_data):
-    """Persist the student's answers for each question."""
-    for question in survey.questions.all():
-        answer, _ = QuestionAnswer.objects.get_or_create(
-            response=response,
-            question=question
+def _student_surveys_page(request, entries):
+    """Paginate summary entries and load the Survey rows for the current page only."""
+    page_obj = Paginator(entries, STUDENT_SURVEYS_PER_PAGE).get_page(request.GET.get('page', 1))
+    surveys = Survey.objects.filter(
+        id__in=[entry['survey_id'] for entry in page_obj]
+    ).select_related('teacher').annotate(question_count=Count('questions')).in_bulk()
+
+    items = []
+    for entry in page_obj:
+        survey = surveys.get(entry['survey_id'])
+        if survey is None:
+            continue
+        survey.is_overdue = entry['is_overdue']
+        survey.is_closed = entry['is_closed']
+        survey.is_draft = entry['is_draft']
+        items.append(survey)
+    page_obj.object_list = items
+    return page_obj
+
+
+def _student_surveys_queryset(user):
+    """Surveys of the student's section the student has not submitted yet, newest first.
+
+    Filters and the question count run in SQL; the student's response state
+    is an ``Exists`` subquery, so only one page of surveys is ever loaded.
+    """
+    if not user.section_id:
+        return Survey.objects.none()
+    responses = StudentResponse.objects.filter(survey=OuterRef('pk'), student=user)
+    return (
+        Survey.objects.filter(sections=user.section_id, status__in=['published', 'closed'])
+        .filter(~Exists(responses.filter(is_submitted=True)))
+        .annotate(
+            is_draft=Exists(responses.filter(is_submitted=False)),
+            question_count=Count('questions'),
         )
-        field_name = f'question_{question.id}'
+        .select_related('teacher')
+    )
 
-        if question.question_type in ['multiple_choice', 'likert']:
+
+def _student_responses_queryset(user):
+    """The student's responses to surveys of their section, with question counts."""
+    if not user.section_id:
+        return StudentResponse.objects.none()
+    return (
+        StudentResponse.objects.filter(
+            student=user,
+            survey__sections=user.section_id,
+            survey__status__in=['published', 'closed'],
+        )
+        .annotate(question_count=Count('survey__questions'))
+        .select_related('survey', 'survey__teacher')
+    )
+
+
+def _set_overdue_flags(items, survey_of, now):
+    for item in items:
+        survey = survey_of(item)
+        item.is_overdue = bool(survey.due_date and survey.due_date < now)
+        item.is_closed = survey.status == 'closed'
+    return items
+
+
+def _keyset_page(request, queryset, fields, per_page=STUDENT_SURVEYS_PER_PAGE):
+    return keyset_paginate(
+        queryset,
+        fields,
+        per_page,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+
+
+def _save_student_answers(response, questions, post_data):
+    """Persist the student's answers for each question.
+
+    ``questions`` comes from the survey snapshot. Existing answers are loaded
+    in one query and written back with one bulk insert and one bulk update.
+    Returns a ``question_id -> QuestionAnswer`` map.
+    """
+    answer_map = {answer.question_id: answer for answer in response.answers.all()}
+    to_create = []
+    to_update = []
+    now = timezone.now()
+
+    for question in questions:
+        field_name = f'question_{question["id"]}'
+        selected_option_id = None
+        true_false_answer = None
+        text_answer = ''
+
+        if question['question_type'] in ['multiple_choice', 'likert']:
             option_id = post_data.get(field_name)
             if option_id:
-                option = question.options.filter(id=option_id).first()
-                answer.selected_option = option
-            else:
-                answer.selected_option = None
-            answer.true_false_answer = None
-            answer.text_answer = ''
+                selected_option_id = next(
+                    (option['id'] for option in question['options'] if str(option['id']) == str(option_id)),
+                    None
+                )
 
-        elif question.question_type == 'true_false':
+        elif question['question_type'] == 'true_false':
             raw_value = post_data.get(field_name)
             if raw_value in ('true', 'false'):
-                answer.true_false_answer = (raw_value == 'true')
-            else:
-                answer.true_false_answer = None
-            answer.selected_option = None
-            answer.text_answer = ''
+                true_false_answer = (raw_value == 'true')
 
         else:
-            answer.text_answer = post_data.get(field_name, '').strip()
-            answer.selected_option = None
-            answer.true_false_answer = None
+            text_answer = post_data.get(field_name, '').strip()
+
+        answer = answer_map.get(question['id'])
+        if answer is None:
+            answer = QuestionAnswer(
+                response=response,
+                question_id=question['id'],
+                selected_option_id=selected_option_id,
+                true_false_answer=true_false_answer,
+                text_answer=text_answer,
+            )
+            answer_map[question['id']] = answer
+            to_create.append(answer)
+        elif (
+            answer.selected_option_id != selected_option_id
+            or answer.true_false_answer != true_false_answer
+            or answer.text_answer != text_answer
+        ):
+            answer.selected_option_id = selected_option_id
+            answer.true_false_answer = true_false_answer
+            answer.text_answer = text_answer
+            answer.updated_at = now
+            to_update.append(answer)
+
+    with transaction.atomic():
+        if to_create:
+            QuestionAnswer.objects.bulk_create(to_create)
+        if to_update:
+            QuestionAnswer.objects.bulk_update(
+                to_update, ['selected_option', 'true_false_answer', 'text_answer', 'updated_at']
+            )
+
+    return answer_map
+
 
-        answer.save()
+def _mark_submitted(response):
+    """Flip ``response`` to submitted with an UPDATE, sending the post_save signal save() would.
+
+    Student summaries and the search index rely on it.
+    """
+    response.is_submitted = True
+    response.submitted_at = timezone.now()
+    StudentResponse.objects.filter(pk=response.pk).update(is_submitted=True, submitted_at=response.submitted_at)
+    post_save.send(
+        sender=StudentResponse,
+        instance=response,
+        created=False,
+        update_fields=frozenset(['is_submitted', 'submitted_at']),
+        raw=False,
+        using=response._state.db,
+    )
 
 def landingPage(request):
     return render(request,'landingPage.html' )
@@ -276,7 +407,7 @@ def registerPage(request):
 
 @login_required
 def dashboardPage(request):
-    auto_close_due_surveys()
+    close_due_surveys_if_needed()
     user = request.user
     context = {
         'user': user,
@@ -302,7 +433,13 @@ def dashboardPage(request):
             'teacher_surveys_page': teacher_surveys_page
         })
     else:
-        context.update(_get_student_survey_data(user))
+        survey_data = _get_student_survey_data(user)
+        context.update(survey_data)
+        page_obj = _student_surveys_page(request, survey_data['available_entries'])
+        context.update({
+            'available_surveys': page_obj,
+            'page_obj': page_obj,
+        })
 
     return render(request, 'dashboard.html', context)
 
@@ -319,41 +456,48 @@ def student_available_surveys(request):
     survey_data = _get_student_survey_data(request.user)
     context.update(survey_data)
     
+    now = survey_data['current_time']
+    surveys = _student_surveys_queryset(request.user)
+    responses = _student_responses_queryset(request.user)
+
     # Apply filter to show different surveys based on dropdown selection
     if filter_type == 'available':
         # Show only published surveys that are not closed/overdue
-        available_only = [s for s in survey_data['available_surveys'] 
-                         if s.status == 'published' and not s.is_overdue and not s.is_closed]
-        context['filtered_surveys'] = available_only
+        queryset = surveys.filter(status='published').filter(Q(due_date__isnull=True) | Q(due_date__gte=now))
+        page_obj = _keyset_page(request, queryset, ['created_at', 'id'])
         context['filter_title'] = 'Available Surveys'
         context['is_response_list'] = False
     elif filter_type == 'pending':
         # Show only pending responses that are not closed
-        pending_only = [r for r in survey_data['pending_responses'] 
-                       if not r.is_overdue and not r.is_closed]
-        context['filtered_surveys'] = pending_only
+        queryset = responses.filter(is_submitted=False, survey__status='published').filter(
+            Q(survey__due_date__isnull=True) | Q(survey__due_date__gte=now)
+        )
+        page_obj = _keyset_page(request, queryset, ['started_at', 'id'])
         context['filter_title'] = 'Pending Surveys'
         context['is_response_list'] = True
     elif filter_type == 'completed':
-        context['filtered_surveys'] = survey_data['completed_responses']
+        page_obj = _keyset_page(request, responses.filter(is_submitted=True), ['submitted_at', 'id'])
         context['filter_title'] = 'Completed Surveys'
         context['is_response_list'] = True
     elif filter_type == 'closed':
         # Show only closed or overdue surveys
-        closed_only = [s for s in survey_data['available_surveys'] 
-                      if s.is_overdue or s.is_closed]
-        context['filtered_surveys'] = closed_only
+        queryset = surveys.filter(Q(status='closed') | Q(due_date__lt=now))
+        page_obj = _keyset_page(request, queryset, ['created_at', 'id'])
         context['filter_title'] = 'Closed Surveys'
         context['is_response_list'] = False
     else:  # 'all'
-        # For 'all', show all surveys including open, closed, and those with responses
-        all_surveys_list = []
-        # Add all available surveys (both open and closed)
-        all_surveys_list.extend(survey_data['available_surveys'])
-        context['filtered_surveys'] = all_surveys_list
+        # For 'all', show all surveys including open and closed ones not yet submitted
+        page_obj = _keyset_page(request, surveys, ['created_at', 'id'])
         context['filter_title'] = 'All Surveys'
         context['is_response_list'] = False
-    
+
+    if context['is_response_list']:
+        _set_overdue_flags(page_obj, lambda response: response.survey, now)
+    else:
+        _set_overdue_flags(page_obj, lambda survey: survey, now)
+    context['filtered_surveys'] = page_obj
+    context['page_obj'] = page_obj
+
     return render(request, 'student_available_surveys.html', context)
 
 
@@ -376,7 +520,11 @@ def _old_student_completed_surveys(request):
         return redirect('dashboard')
 
     context = {'user': request.user}
-    context.update(_get_student_survey_data(request.user))
+    survey_data = _get_student_survey_data(request.user)
+    context.update(survey_data)
+    context['completed_responses'] = _keyset_page(
+        request, _student_responses_queryset(request.user).filter(is_submitted=True), ['submitted_at', 'id']
+    )
     return render(request, 'student_completed_surveys.html', context)
 
 
@@ -388,7 +536,15 @@ def student_history(request):
         return redirect('dashboard')
 
     context = {'user': request.user}
-    context.update(_get_student_survey_data(request.user))
+    survey_data = _get_student_survey_data(request.user)
+    context.update(survey_data)
+    page_obj = _keyset_page(
+        request, _student_responses_queryset(request.user).filter(is_submitted=True), ['submitted_at', 'id']
+    )
+    context.update({
+        'completed_responses': page_obj,
+        'page_obj': page_obj,
+    })
     return render(request, 'student_history.html', context)
 
 
@@ -414,7 +570,8 @@ def student_view_response(request, response_id):
         'selected_option'
     ).prefetch_related(
         'question__options',
-        'question__enumeration_answers'
+        'question__enumeration_answers',
+        'question__context_items'
     ).order_by('question__order')
 
     context = {
@@ -439,10 +596,11 @@ def survey_list(request):
         messages.error(request, 'Only teachers can access this page.')
         return redirect('dashboard')
 
-    auto_close_due_surveys()
+    close_due_surveys_if_needed()
     surveys = Survey.objects.filter(teacher=request.user)
     context = {
         'surveys': surveys,
+        'sections': Section.objects.filter(teacher=request.user).order_by('name'),
         'user': request.user
     }
     return render(request, 'survey_list.html', context)
@@ -455,7 +613,7 @@ def survey_builder(request, survey_id=None):
         messages.error(request, 'Only teachers can access this page.')
         return redirect('dashboard')
 
-    auto_close_due_surveys()
+    close_due_surveys_if_needed()
     survey = None
     if survey_id:
         survey = get_object_or_404(Survey, id=survey_id, teacher=request.user)
@@ -497,6 +655,22 @@ def save_survey(request):
             else:
                 survey = Survey(teacher=request.user)
 
+            # The builder sends the revision it last saw; refuse to overwrite edits made elsewhere since
+            base_revision = data.get('base_revision')
+            if survey.pk and base_revision is not None:
+                try:
+                    base_revision = int(base_revision)
+                except (TypeError, ValueError):
+                    return JsonResponse({'success': False, 'message': 'Invalid base_revision'}, status=400)
+                if not Survey.objects.filter(pk=survey.pk, revision=base_revision).update(revision=F('revision') + 1):
+                    return JsonResponse({
+                        'success': False,
+                        'message': SURVEY_CONFLICT_MESSAGE,
+                        'revision': Survey.objects.filter(pk=survey.pk).values_list('revision', flat=True).first(),
+                    }, status=409)
+                # Saved below as base_revision + 1, matching the bump above
+                survey.revision = base_revision
+
             survey.title = data.get('title') or 'Untitled Survey'
             survey.description = data.get('description') or ''
             survey.status = data.get('status') or 'draft'
@@ -512,6 +686,7 @@ def save_survey(request):
                     survey.time_limit = None
 
             survey.due_date = parse_due_date(data.get('due_date'))
+            survey.revision += 1
             survey.save()
 
             # Handle sections (ids may be strings)
@@ -525,118 +700,13 @@ def save_survey(request):
             else:
                 survey.sections.clear()
 
+            question_ids = {}
+            context_ids = {}
+            option_ids = {}
             if questions_provided:
-                # When editing an existing survey, clear previous questions first
-                if survey.pk:
-                    survey.questions.all().delete()
-
                 questions_data = data.get('questions') or []
                 logger.info(f"Processing {len(questions_data)} questions")
-
-                for idx, q_data in enumerate(questions_data):
-                    try:
-                        q_type = q_data.get('type') or q_data.get('question_type')
-                        q_text = q_data.get('text') or q_data.get('question_text') or ''
-                        if not q_type:
-                            logger.warning(f"Question {idx} has no type, skipping")
-                            continue
-
-                        # Text elements (heading, subheading, paragraph) don't need points/required
-                        is_text_element = q_type in ['heading', 'subheading', 'paragraph']
-
-                        base_kwargs = {
-                            'survey': survey,
-                            'question_type': q_type,
-                            'question_text': q_text,
-                            'order': idx,
-                        }
-
-                        # Only add points and required for actual questions, not text elements
-                        if not is_text_element:
-                            base_kwargs['points'] = 0  # points removed for survey mode
-                            base_kwargs['required'] = bool(q_data.get('required', True))
-                        else:
-                            base_kwargs['points'] = 0  # Text elements have no points
-                            base_kwargs['required'] = False  # Text elements are not required
-
-                        question = Question.objects.create(**base_kwargs)
-                        logger.debug(f"Created question {idx}: {q_type} - {q_text[:50] if q_text else 'no text'}")
-
-                        # Handle nested items for headings
-                        if q_type == 'heading':
-                            nested_items = q_data.get('nested_items', [])
-                            if nested_items:
-                                logger.debug(f"Processing {len(nested_items)} nested items for heading")
-                                for nested_idx, nested_item in enumerate(nested_items):
-                                    try:
-                                        nested_type = nested_item.get('type')
-                                        nested_text = nested_item.get('text', '')
-                                        if nested_type in ['subheading', 'paragraph']:
-                                            # Create nested text element as a separate question with a special marker
-                                            Question.objects.create(
-                                                survey=survey,
-                                                question_type=nested_type,
-                                                question_text=nested_text,
-                                                points=0,
-                                                order=idx + 0.001 * (nested_idx + 1),  # Fractional order to maintain nesting
-                                                required=False,
-                                            )
-                                    except Exception as nested_error:
-                                        logger.error(f"Error saving nested item: {nested_error}")
-
-                        # Only process question-specific data for actual questions
-                        if not is_text_element:
-                            if q_type in ['multiple_choice', 'likert']:
-                                options = q_data.get('options') or []
-                                if not options:
-                                    logger.warning(f"{q_type} question {idx} has no options")
-                                for opt_idx, option in enumerate(options):
-                                    MultipleChoiceOption.objects.create(
-                                        question=question,
-                                        option_text=option.get('text', ''),
-                                        is_correct=bool(option.get('is_correct') or option.get('correct')) if q_type == 'multiple_choice' else False,
-                                        order=opt_idx,
-                                    )
-
-                            elif q_type == 'true_false':
-                                TrueFalseAnswer.objects.create(
-                                    question=question,
-                                    is_true=bool(q_data.get('correct_answer', True)),
-                                )
-
-                            elif q_type == 'enumeration':
-                                answers = q_data.get('answers') or []
-                                if not answers:
-                                    logger.warning(f"Enumeration question {idx} has no answers")
-                                for ans_idx, answer in enumerate(answers):
-                                    EnumerationAnswer.objects.create(
-                                        question=question,
-                                        answer_text=str(answer),
-                                        order=ans_idx,
-                                    )
-
-                        # Save context items (code snippets and images)
-                        context_items = q_data.get('context_items', [])
-                        if context_items:
-                            logger.debug(f"Saving {len(context_items)} context items for question {idx}")
-                            for ctx_item in context_items:
-                                try:
-                                    QuestionContext.objects.create(
-                                        question=question,
-                                        context_type=ctx_item.get('type', 'code_snippet'),
-                                        content=ctx_item.get('content', ''),
-                                        language=ctx_item.get('language', ''),
-                                        order=ctx_item.get('order', 0)
-                                    )
-                                except Exception as ctx_error:
-                                    logger.error(f"Error saving context item: {ctx_error}")
-
-                    except Exception as q_error:
-                        logger.error(f"Error processing question {idx} (type: {q_type if 'q_type' in locals() else 'unknown'}): {q_error}")
-                        import traceback
-                        logger.error(traceback.format_exc())
-                        # Continue processing other questions instead of failing entire save
-                        continue
+                question_ids, context_ids, option_ids = sync_survey_questions(survey, questions_data)
 
                 # Safely recalculate total points
                 try:
@@ -649,6 +719,10 @@ def save_survey(request):
                 'success': True,
                 'message': 'Survey saved successfully!',
                 'survey_id': survey.id,
+                'question_ids': question_ids,
+                'context_ids': context_ids,
+                'option_ids': option_ids,
+                'revision': survey.revision,
             })
 
     except Exception as e:
@@ -658,6 +732,84 @@ def save_survey(request):
         return JsonResponse({'success': False, 'message': f'Error saving survey: {str(e)}'}, status=500)
 
 
+@login_required
+@require_http_methods(["POST"])
+def survey_operations(request, survey_id):
+    """AJAX endpoint applying small builder edits (patch-style autosave)"""
+    if request.user.role != 'teacher':
+        return JsonResponse({'success': False, 'message': 'Unauthorized'}, status=403)
+
+    survey = get_object_or_404(Survey, id=survey_id, teacher=request.user)
+
+    try:
+        raw = request.body.decode('utf-8') if request.body else '{}'
+        data = json.loads(raw or '{}')
+        base_revision = int(data.get('base_revision'))
+    except (json.JSONDecodeError, UnicodeDecodeError, TypeError, ValueError) as e:
+        return JsonResponse({'success': False, 'message': f'Invalid request: {e}'}, status=400)
+
+    try:
+        revision, option_ids = apply_survey_operations(survey, base_revision, data.get('ops'))
+    except SurveyRevisionConflict as conflict:
+        return JsonResponse({
+            'success': False,
+            'message': SURVEY_CONFLICT_MESSAGE,
+            'revision': conflict.revision,
+        }, status=409)
+    except SurveyOperationError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Error applying survey operations: {e}")
+        return JsonResponse({'success': False, 'message': f'Error saving survey: {str(e)}'}, status=500)
+
+    return JsonResponse({
+        'success': True,
+        'revision': revision,
+        'option_ids': option_ids,
+    })
+
+
+@login_required
+@require_http_methods(["POST"])
+def upload_blob(request):
+    """AJAX endpoint storing an uploaded context image in the blob store"""
+    if request.user.role != 'teacher':
+        return JsonResponse({'success': False, 'message': 'Unauthorized'}, status=403)
+
+    upload = request.FILES.get('file')
+    if not upload:
+        return JsonResponse({'success': False, 'message': 'No file uploaded'}, status=400)
+    if upload.size > MAX_BLOB_SIZE:
+        return JsonResponse({'success': False, 'message': 'Image size should be less than 5MB'}, status=400)
+
+    try:
+        name = store_image(upload.read())
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+    return JsonResponse({'success': True, 'url': blob_url(name)})
+
+
+@require_http_methods(["GET", "HEAD"])
+def serve_blob(request, name):
+    """Serve a content-addressed blob; its URL never changes content, so cache forever"""
+    content_type = blob_content_type(name)
+    if content_type is None:
+        raise Http404('Blob not found')
+
+    etag = f'"{name}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        try:
+            response = FileResponse(open_blob(name), content_type=content_type)
+        except FileNotFoundError:
+            raise Http404('Blob not found')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
 @login_required
 @require_http_methods(["GET"])
 def get_survey_data(request, survey_id):
@@ -666,67 +818,20 @@ def get_survey_data(request, survey_id):
         return JsonResponse({'success': False, 'message': 'Unauthorized'}, status=403)
 
     try:
-        auto_close_due_surveys()
+        close_due_surveys_if_needed()
         survey = get_object_or_404(Survey, id=survey_id, teacher=request.user)
 
-        questions_data = []
-        for question in survey.questions.all():
-            q_data = {
-                'id': question.id,
-                'type': question.question_type,
-                'text': question.question_text,
-                'points': question.points,
-                'required': question.required,
-                'order': question.order
-            }
-
-            if question.question_type in ['multiple_choice', 'likert']:
-                q_data['options'] = [
-                    {
-                        'text': opt.option_text,
-                        'is_correct': opt.is_correct
-                    }
-                    for opt in question.options.all()
-                ]
-
-            elif question.question_type == 'true_false':
-                if hasattr(question, 'true_false_answer'):
-                    q_data['correct_answer'] = question.true_false_answer.is_true
-
-            elif question.question_type == 'enumeration':
-                q_data['answers'] = [
-                    ans.answer_text for ans in question.enumeration_answers.all()
-                ]
-            
-            # Include context items
-            if hasattr(question, 'context_items'):
-                q_data['context_items'] = [
-                    {
-                        'type': ctx.context_type,
-                        'content': ctx.content,
-                        'language': ctx.language,
-                        'order': ctx.order
-                    }
-                    for ctx in question.context_items.all()
-                ]
-
-            questions_data.append(q_data)
-
-        survey_data = {
-            'id': survey.id,
-            'title': survey.title,
-            'description': survey.description,
-            'status': survey.status,
-            'time_limit': survey.time_limit,
-            'due_date': survey.due_date.isoformat() if survey.due_date else None,
-            'sections': list(survey.sections.values_list('id', flat=True)),
-            'questions': questions_data,
-            'total_points': survey.total_points
-        }
+        questions = load_survey_tree(survey)
+        # Large surveys are encoded question by question instead of as one string
+        if len(questions) > STREAM_QUESTION_THRESHOLD:
+            return StreamingHttpResponse(
+                iter_survey_json(survey, questions, envelope={'success': True}),
+                content_type='application/json'
+            )
 
         return JsonResponse({
             'success': True,
-            'survey': survey_data
+            'survey': serialize_survey(survey, questions)
         })
 
     except Exception as e:
@@ -760,69 +865,44 @@ def delete_survey(request, survey_id):
 
 
 @login_required
+@require_http_methods(["POST"])
 def duplicate_survey(request, survey_id):
-    """Duplicate a survey with all its questions and options (without responses)"""
+    """Duplicate a survey with all its questions and options (without responses).
+
+    An optional JSON body ``{"section_ids": [...]}`` makes one copy per section.
+    """
     if request.user.role != 'teacher':
         return JsonResponse({'success': False, 'message': 'Unauthorized'}, status=403)
 
+    original_survey = get_object_or_404(Survey, id=survey_id, teacher=request.user)
+
     try:
-        # Get the original survey
-        original_survey = get_object_or_404(Survey, id=survey_id, teacher=request.user)
-        
-        # Create a copy of the survey (as draft, without responses)
-        new_survey = Survey.objects.create(
-            teacher=request.user,
-            title=f"{original_survey.title} (Copy)",
-            description=original_survey.description,
-            status='draft',  # Always set as draft
-            due_date=original_survey.due_date,
-            time_limit=original_survey.time_limit
-        )
-        
-        # Copy assigned sections
-        new_survey.sections.set(original_survey.sections.all())
-        
-        # Copy all questions with their options and context items
-        questions = original_survey.questions.all().order_by('order')
-        for question in questions:
-            # Create new question
-            new_question = Question.objects.create(
-                survey=new_survey,
-                question_text=question.question_text,
-                question_type=question.question_type,
-                required=question.required,
-                points=question.points,
-                order=question.order
-            )
-            
-            # Copy multiple choice options if applicable
-            if question.question_type == 'multiple_choice':
-                options = question.options.all()
-                for option in options:
-                    MultipleChoiceOption.objects.create(
-                        question=new_question,
-                        option_text=option.option_text,
-                        is_correct=option.is_correct
-                    )
-            
-            # Copy question context items (code snippets, images, etc.)
-            context_items = question.context_items.all()
-            for context in context_items:
-                QuestionContext.objects.create(
-                    question=new_question,
-                    context_type=context.context_type,
-                    content=context.content,
-                    language=context.language,
-                    order=context.order
-                )
-        
-        # Recalculate total points for the new survey
-        new_survey.calculate_total_points()
-        
+        data = json.loads(request.body) if request.content_type == 'application/json' and request.body else {}
+        section_ids = data.get('section_ids') or []
+        if not isinstance(section_ids, list):
+            raise ValueError('section_ids must be a list')
+        section_ids = [int(sid) for sid in section_ids]
+    except (AttributeError, TypeError, ValueError):
+        return JsonResponse({'success': False, 'message': 'Invalid section selection'}, status=400)
+
+    try:
+        sections = None
+        if section_ids:
+            sections = list(Section.objects.filter(id__in=section_ids, teacher=request.user).order_by('name'))
+            if len(sections) != len(set(section_ids)):
+                return JsonResponse({'success': False, 'message': 'Invalid section selection'}, status=400)
+
+        new_surveys = clone_survey(original_survey, request.user, sections=sections)
+
+        if len(new_surveys) == 1:
+            message = 'Survey duplicated successfully! (No responses copied)'
+        else:
+            message = f'Survey duplicated into {len(new_surveys)} sections! (No responses copied)'
         return JsonResponse({
             'success': True,
-            'message': 'Survey duplicated successfully! (No responses copied)',
-            'survey_id': new_survey.id
+            'message': message,
+            'survey_id': new_surveys[0].id,
+            'survey_ids': [survey.id for survey in new_surveys]
         })
 
     except Exception as e:
@@ -839,10 +919,9 @@ def take_survey(request, survey_id):
         messages.error(request, 'Only students can access this page.')
         return redirect('dashboard')
 
-    auto_close_due_surveys()
+    close_due_surveys_if_needed()
     survey = get_object_or_404(
-        Survey.objects.select_related('teacher')
-        .prefetch_related('questions__options', 'questions__enumeration_answers', 'questions__context_items'),
+        Survey.objects.select_related('teacher'),
         id=survey_id,
         status__in=['published', 'closed']
     )
@@ -861,59 +940,99 @@ def take_survey(request, survey_id):
         messages.info(request, 'You have already submitted this survey.')
         return redirect('student_completed_surveys')
 
+    questions = get_survey_snapshot(survey)['questions']
+
     if request.method == 'POST':
         response, _ = StudentResponse.objects.get_or_create(
             survey=survey,
             student=request.user,
             defaults={'is_submitted': False}
         )
-        action = request.POST.get('action', 'draft')
-        _save_student_answers(response, survey, request.POST)
-
-        if action == 'submit':
-            missing_required = []
-            for question in survey.questions.all():
-                if not question.required:
-                    continue
-                answer = response.answers.filter(question=question).first()
-                if not answer:
-                    missing_required.append(question)
-                    continue
-
-                if question.question_type in ['multiple_choice', 'likert']:
-                    if not answer.selected_option_id:
-                        missing_required.append(question)
-                elif question.question_type == 'true_false':
-                    if answer.true_false_answer is None:
-                        missing_required.append(question)
-                else:
-                    if not answer.text_answer.strip():
-                        missing_required.append(question)
-
-            if missing_required:
-                messages.error(request, 'Please answer all required questions before submitting.')
-                return redirect('take_survey', survey_id=survey.id)
-
-            response.is_submitted = True
-            response.submitted_at = timezone.now()
-            response.save(update_fields=['is_submitted', 'submitted_at'])
+        submitting = request.POST.get('action', 'draft') == 'submit'
+        missing_question_ids = []
+        with transaction.atomic():
+            # Of two concurrent POSTs only one finds the response unsubmitted; its
+            # row lock holds the other back until this transaction commits
+            claimed = StudentResponse.objects.filter(pk=response.pk, is_submitted=False).update(submitted_at=None)
+            if claimed:
+                answer_map = _save_student_answers(response, questions, request.POST)
+                if submitting:
+                    missing_question_ids = _find_missing_required_answers(questions, answer_map)
+                    if not missing_question_ids:
+                        _mark_submitted(response)
+                        record_submission(response)
+
+        if not claimed:
+            # Another request (a double-click or a retry) submitted it first
+            messages.info(request, 'You have already submitted this survey.')
+            return redirect('student_completed_surveys')
+
+        if missing_question_ids:
+            error_message = 'Please answer all required questions before submitting.'
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return JsonResponse({
+                    'success': False,
+                    'message': error_message,
+                    'missing_question_ids': missing_question_ids,
+                }, status=400)
+            messages.error(request, error_message)
+            return _render_take_survey(request, survey, questions, section, response, answer_map, missing_question_ids)
+
+        if submitting:
             messages.success(request, 'Survey submitted successfully!')
             return redirect('student_completed_surveys')
-        else:
-            response.is_submitted = False
-            response.submitted_at = None
-            response.save(update_fields=['is_submitted', 'submitted_at'])
-            messages.success(request, 'Draft saved.')
-            return redirect('student_pending_surveys')
+        messages.success(request, 'Draft saved.')
+        return redirect('student_pending_surveys')
 
     answer_map = {}
     if response:
-        for answer in response.answers.select_related('selected_option'):
+        for answer in response.answers.all():
             answer_map[answer.question_id] = answer
 
-    questions = list(survey.questions.all())
+    return _render_take_survey(request, survey, questions, section, response, answer_map)
+
+
+def _find_missing_required_answers(questions, answer_map):
+    """Return ids of required questions left unanswered, checked in memory.
+
+    ``questions`` comes from the survey snapshot and ``answer_map`` is the
+    ``question_id -> QuestionAnswer`` map returned by ``_save_student_answers``.
+    """
+    missing_question_ids = []
     for question in questions:
-        question.existing_answer = answer_map.get(question.id)
+        if not question['required']:
+            continue
+        answer = answer_map.get(question['id'])
+        if not answer:
+            missing_question_ids.append(question['id'])
+            continue
+
+        if question['question_type'] in ['multiple_choice', 'likert']:
+            if not answer.selected_option_id:
+                missing_question_ids.append(question['id'])
+        elif question['question_type'] == 'true_false':
+            if answer.true_false_answer is None:
+                missing_question_ids.append(question['id'])
+        else:
+            if not answer.text_answer.strip():
+                missing_question_ids.append(question['id'])
+    return missing_question_ids
+
+
+def _answer_state(answer_map):
+    """Per-student form state applied client-side over the cached question blocks."""
+    answer_state = {}
+    for question_id, answer in answer_map.items():
+        if answer.selected_option_id:
+            answer_state[question_id] = {'value': str(answer.selected_option_id)}
+        elif answer.true_false_answer is not None:
+            answer_state[question_id] = {'value': 'true' if answer.true_false_answer else 'false'}
+        elif answer.text_answer:
+            answer_state[question_id] = {'text': answer.text_answer}
+    return answer_state
+
+
+def _render_take_survey(request, survey, questions, section, response, answer_map, missing_question_ids=()):
 
     context = {
         'user': request.user,
@@ -921,6 +1040,9 @@ def take_survey(request, survey_id):
         'student_section': section,
         'response': response,
         'questions': questions,
+        'answer_state': _answer_state(answer_map),
+        'missing_question_ids': list(missing_question_ids),
+        'fragment_timeout': settings.TAKE_SURVEY_FRAGMENT_TIMEOUT,
     }
     return render(request, 'student_take_survey.html', context)
 
@@ -1070,6 +1192,66 @@ def delete_section(request, section_id):
         }, status=500)
 
 
+@login_required
+@require_http_methods(["POST"])
+def import_section_students(request, section_id):
+    """Queue the creation of student accounts in a section from an uploaded CSV.
+
+    Columns: username, password, and optionally email, first_name, last_name.
+    The file is validated here; nothing is queued unless every row is valid.
+    Hashing the passwords takes too long for a request, so the accounts are
+    created by the job worker while the page polls ``import_job_status``.
+    """
+    if request.user.role != 'teacher':
+        return JsonResponse({'success': False, 'message': 'Unauthorized'}, status=403)
+
+    section = get_object_or_404(Section, id=section_id, teacher=request.user)
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'success': False, 'message': 'Please choose a CSV file'}, status=400)
+    if upload.size > MAX_IMPORT_FILE_SIZE:
+        return JsonResponse({'success': False, 'message': 'The file is larger than 5 MB'}, status=400)
+
+    try:
+        text = upload.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return JsonResponse({'success': False, 'message': 'The file must be UTF-8 encoded CSV'}, status=400)
+
+    rows, errors = parse_student_csv(text)
+    if errors:
+        return JsonResponse({
+            'success': False,
+            'message': 'The file has problems; no students were imported',
+            'errors': errors,
+        }, status=400)
+
+    try:
+        job = enqueue_import(request.user, section, rows)
+    except Exception as e:
+        return JsonResponse({'success': False, 'message': f'Error queuing import: {str(e)}'}, status=500)
+
+    logger.info(f"Queued import job {job.id} of {len(rows)} students into section {section.id}")
+    return JsonResponse({
+        'success': True,
+        'message': f'Importing {len(rows)} student{"s" if len(rows) != 1 else ""} into {section.name}',
+        'job_id': job.id,
+        'status_url': reverse('import_job_status', args=[job.id]),
+    }, status=202)
+
+
+@login_required
+def import_job_status(request, job_id):
+    """Polled by the sections page while students are imported; a single-row lookup"""
+    # Without a running worker this is what eventually fails the job and deletes its passwords
+    expire_stale_imports()
+    job = StudentImportJob.objects.filter(id=job_id, teacher=request.user).values(
+        'id', 'status', 'progress', 'total', 'created', 'error'
+    ).first()
+    if job is None:
+        return JsonResponse({'success': False, 'message': 'Import not found'}, status=404)
+    return JsonResponse({'success': True, 'job': import_status(job)})
+
+
 @login_required
 @require_http_methods(["POST"])
 def remove_student_from_section(request, section_id, user_id):
@@ -1103,13 +1285,17 @@ def response_management(request):
     date_filter = request.GET.get("date", "")
     section_filter = request.GET.get("section", "")
 
-    # Explicit ordering fixes pagination warning
     responses = StudentResponse.objects.filter(
         survey__teacher=teacher,
-        is_submitted=True
-    ).select_related("student", "survey", "student__section").order_by('-submitted_at')
-
-    if search_query:
+        is_submitted=True,
+        submitted_at__isnull=False,
+    ).select_related("student", "survey", "student__section")
+
+    search = search_sql(teacher.id, search_query) if search_query else None
+    if search is not None:
+        # Word-prefix match against the full-text index instead of scanning with LIKE
+        responses = responses.filter(id__in=RawSQL(*search))
+    elif search_query:
         responses = responses.filter(
             Q(student__username__icontains=search_query) |
             Q(student__first_name__icontains=search_query) |
@@ -1123,10 +1309,21 @@ def response_management(request):
     if section_filter:
         responses = responses.filter(student__section_id=section_filter)
 
-    paginator = Paginator(responses, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    
+    rank = search_rank_sql(search_query) if search is not None else None
+    if rank is not None:
+        # Best matches first, paged by relevance
+        ranked = responses.annotate(search_rank=RawSQL(*rank, output_field=FloatField()))
+        page_obj = _keyset_page(request, ranked, ['search_rank', 'id'], RESPONSES_PER_PAGE)
+    else:
+        page_obj = _keyset_page(request, responses, ['submitted_at', 'id'], RESPONSES_PER_PAGE)
+    if search_query or date_filter or section_filter:
+        total_responses = cached_count(responses)
+    else:
+        # The per-survey response counters already hold the unfiltered total
+        total_responses = AnswerCount.objects.filter(
+            survey__teacher=teacher, question__isnull=True
+        ).aggregate(total=Sum('count'))['total'] or 0
+
     # Get unique surveys with responses for analytics dropdown
     # Annotate with only submitted response count
     surveys_with_responses = Survey.objects.filter(
@@ -1141,6 +1338,7 @@ def response_management(request):
 
     return render(request, "responses.html", {
         "page_obj": page_obj,
+        "total_responses": total_responses,
         "search_query": search_query,
         "date_filter": date_filter,
         "section_filter": section_filter,
@@ -1149,6 +1347,84 @@ def response_management(request):
     })
 
 
+def _export_response(request, survey=None):
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        raise Http404('Unknown export format')
+    response = StreamingHttpResponse(
+        iter_export(request.user, survey, export_format),
+        content_type=EXPORT_FORMATS[export_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(request.user, survey, export_format)}"'
+    return response
+
+
+@login_required
+def export_responses(request):
+    """Download every submitted response to the teacher's surveys (?format=csv|xlsx)"""
+    if request.user.role != 'teacher':
+        messages.error(request, "Access denied. Teacher account required.")
+        return redirect('dashboard')
+    return _export_response(request)
+
+
+@login_required
+def export_survey_responses(request, survey_id):
+    """Download the submitted responses of one survey (?format=csv|xlsx)"""
+    survey = get_object_or_404(Survey, id=survey_id, teacher=request.user)
+    return _export_response(request, survey)
+
+
+@login_required
+@require_http_methods(["POST"])
+def start_export_job(request):
+    """Queue a background export archive; an optional JSON body ``{"survey_ids": [...]}`` limits it"""
+    if request.user.role != 'teacher':
+        return JsonResponse({'success': False, 'message': 'Unauthorized'}, status=403)
+
+    try:
+        data = json.loads(request.body) if request.content_type == 'application/json' and request.body else {}
+        survey_ids = data.get('survey_ids') or []
+        if survey_ids and Survey.objects.filter(id__in=survey_ids, teacher=request.user).count() != len(set(survey_ids)):
+            return JsonResponse({'success': False, 'message': 'Invalid survey selection'}, status=400)
+
+        job = enqueue_export(request.user, survey_ids)
+        return JsonResponse({
+            'success': True,
+            'message': 'Export queued',
+            'job_id': job.id,
+            'status_url': reverse('export_job_status', args=[job.id]),
+        })
+
+    except Exception as e:
+        return JsonResponse({'success': False, 'message': f'Error queuing export: {str(e)}'}, status=500)
+
+
+@login_required
+def export_job_status(request, job_id):
+    """Polled by the responses page while an export is built; a single-row lookup"""
+    job = ExportJob.objects.filter(id=job_id, teacher=request.user).values(
+        'id', 'status', 'progress', 'total', 'error'
+    ).first()
+    if job is None:
+        return JsonResponse({'success': False, 'message': 'Export not found'}, status=404)
+    return JsonResponse({'success': True, 'job': job_status(job)})
+
+
+@login_required
+def download_export_job(request, job_id):
+    job = get_object_or_404(ExportJob, id=job_id, teacher=request.user, status='done')
+    storage = get_export_storage()
+    if not storage.exists(job.file_name):
+        raise Http404('Export archive no longer exists')
+    return FileResponse(
+        storage.open(job.file_name, 'rb'),
+        as_attachment=True,
+        filename=job.file_name,
+        content_type='application/zip',
+    )
+
+
 def response_detail(request, pk):
     response = get_object_or_404(StudentResponse, pk=pk)
     answers = QuestionAnswer.objects.filter(response=response).order_by('question__order')
@@ -1160,228 +1436,50 @@ def response_detail(request, pk):
     return render(request, 'response_detail.html', context)
 
 
-@login_required
 @login_required
 def survey_analytics(request, survey_id):
     """Analytics page with pie charts, bar charts, and word clouds using Chart.js"""
     survey = get_object_or_404(Survey, id=survey_id, teacher=request.user)
-    
-    # Get all submitted responses for this survey
-    responses = StudentResponse.objects.filter(
-        survey=survey,
-        is_submitted=True
-    ).select_related('student')
-    
-    # Get all questions for this survey
-    questions = survey.questions.all().prefetch_related(
-        'options',
-        'true_false_answer',
-        'enumeration_answers'
-    )
-    
-    charts_data = []
-    
-    for question in questions:
-        chart_info = {
-            'question_text': question.question_text,
-            'type': question.question_type,
-            'data': {}
-        }
-        
-        # Get all answers for this question
-        answers = QuestionAnswer.objects.filter(
-            question=question,
-            response__in=responses
-        )
-        
-        if question.question_type in ['multiple_choice', 'likert']:
-            # Prepare data for pie chart and bar chart
-            labels = []
-            values = []
-            for option in question.options.all():
-                count = answers.filter(selected_option=option).count()
-                labels.append(option.option_text)
-                values.append(count)
-            
-            if sum(values) > 0:
-                chart_info['data'] = {
-                    'labels': labels,
-                    'values': values
-                }
-        
-        elif question.question_type == 'true_false':
-            # Prepare data for true/false pie chart
-            true_count = answers.filter(true_false_answer=True).count()
-            false_count = answers.filter(true_false_answer=False).count()
-            
-            if true_count + false_count > 0:
-                chart_info['data'] = {
-                    'labels': ['True', 'False'],
-                    'values': [true_count, false_count]
-                }
-        
-        elif question.question_type == 'essay':
-            # Prepare word frequency data for word cloud
-            text_answers = answers.exclude(text_answer='').values_list('text_answer', flat=True)
-            
-            if text_answers:
-                # Combine all text and count word frequencies
-                combined_text = ' '.join(text_answers).lower()
-                words = combined_text.split()
-                # Filter out common words only
-                stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-                             'of', 'with', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
-                             'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
-                             'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those'}
-                words = [w for w in words if w not in stop_words and len(w) > 1]
-                word_freq = Counter(words)
-                # Get top 50 most common words
-                top_words = word_freq.most_common(50)
-                
-                chart_info['data'] = {
-                    'words': [{'text': word, 'size': count} for word, count in top_words],
-                    'total_responses': len(text_answers)
-                }
-        
-        elif question.question_type == 'enumeration':
-            # Prepare word frequency data for enumeration
-            text_answers = answers.exclude(text_answer='').values_list('text_answer', flat=True)
-            
-            if text_answers:
-                combined_text = ' '.join(text_answers).lower()
-                words = combined_text.split()
-                stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-                             'of', 'with', 'is', 'are', 'was', 'were', 'be', 'been', 'being'}
-                words = [w for w in words if w not in stop_words and len(w) > 1]
-                word_freq = Counter(words)
-                # Get top 50 most common words
-                top_words = word_freq.most_common(50)
-                
-                chart_info['data'] = {
-                    'words': [{'text': word, 'size': count} for word, count in top_words],
-                    'total_responses': len(text_answers)
-                }
-        
-        if chart_info['data']:
-            charts_data.append(chart_info)
-    
+    analytics_version = get_analytics_version(survey.id)
+    charts_data, total_responses = get_survey_analytics(survey)
+
     context = {
         'survey': survey,
         'charts_data': json.dumps(charts_data),
-        'total_responses': responses.count(),
+        'total_responses': total_responses,
+        'analytics_version': analytics_version,
+        'analytics_poll_interval': settings.ANALYTICS_POLL_INTERVAL,
     }
-    
+
     return render(request, 'survey_analytics.html', context)
 
 
 @login_required
 def survey_analytics_data(request, survey_id):
-    """API endpoint to fetch real-time analytics data"""
+    """API endpoint to fetch real-time analytics data.
+
+    When the client's If-None-Match matches the current analytics version the
+    answer is an immediate 304, without recomputing anything; the page polls
+    every ``ANALYTICS_POLL_INTERVAL`` seconds.
+    """
     survey = get_object_or_404(Survey, id=survey_id, teacher=request.user)
-    
-    # Get all submitted responses for this survey
-    responses = StudentResponse.objects.filter(
-        survey=survey,
-        is_submitted=True
-    ).select_related('student')
-    
-    # Get all questions for this survey
-    questions = survey.questions.all().prefetch_related(
-        'options',
-        'true_false_answer',
-        'enumeration_answers'
-    )
-    
-    charts_data = []
-    
-    for question in questions:
-        chart_info = {
-            'question_text': question.question_text,
-            'type': question.question_type,
-            'data': {}
-        }
-        
-        # Get all answers for this question
-        answers = QuestionAnswer.objects.filter(
-            question=question,
-            response__in=responses
-        )
-        
-        if question.question_type in ['multiple_choice', 'likert']:
-            # Prepare data for pie chart and bar chart
-            labels = []
-            values = []
-            for option in question.options.all():
-                count = answers.filter(selected_option=option).count()
-                labels.append(option.option_text)
-                values.append(count)
-            
-            if sum(values) > 0:
-                chart_info['data'] = {
-                    'labels': labels,
-                    'values': values
-                }
-        
-        elif question.question_type == 'true_false':
-            # Prepare data for true/false pie chart
-            true_count = answers.filter(true_false_answer=True).count()
-            false_count = answers.filter(true_false_answer=False).count()
-            
-            if true_count + false_count > 0:
-                chart_info['data'] = {
-                    'labels': ['True', 'False'],
-                    'values': [true_count, false_count]
-                }
-        
-        elif question.question_type == 'essay':
-            # Prepare word frequency data for word cloud
-            text_answers = answers.exclude(text_answer='').values_list('text_answer', flat=True)
-            
-            if text_answers:
-                # Combine all text and count word frequencies
-                combined_text = ' '.join(text_answers).lower()
-                words = combined_text.split()
-                # Filter out common words only
-                stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-                             'of', 'with', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
-                             'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could',
-                             'should', 'may', 'might', 'must', 'can', 'this', 'that', 'these', 'those'}
-                words = [w for w in words if w not in stop_words and len(w) > 1]
-                word_freq = Counter(words)
-                # Get top 50 most common words
-                top_words = word_freq.most_common(50)
-                
-                chart_info['data'] = {
-                    'words': [{'text': word, 'size': count} for word, count in top_words],
-                    'total_responses': len(text_answers)
-                }
-        
-        elif question.question_type == 'enumeration':
-            # Prepare word frequency data for enumeration
-            text_answers = answers.exclude(text_answer='').values_list('text_answer', flat=True)
-            
-            if text_answers:
-                combined_text = ' '.join(text_answers).lower()
-                words = combined_text.split()
-                stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-                             'of', 'with', 'is', 'are', 'was', 'were', 'be', 'been', 'being'}
-                words = [w for w in words if w not in stop_words and len(w) > 1]
-                word_freq = Counter(words)
-                # Get top 50 most common words
-                top_words = word_freq.most_common(50)
-                
-                chart_info['data'] = {
-                    'words': [{'text': word, 'size': count} for word, count in top_words],
-                    'total_responses': len(text_answers)
-                }
-        
-        if chart_info['data']:
-            charts_data.append(chart_info)
-    
-    return JsonResponse({
+
+    version = get_analytics_version(survey.id)
+    if request.headers.get('If-None-Match') == f'"{version}"':
+        not_modified = HttpResponseNotModified()
+        not_modified['ETag'] = f'"{version}"'
+        not_modified['Cache-Control'] = 'no-store'
+        return not_modified
+
+    charts_data, total_responses = get_survey_analytics(survey)
+
+    response = JsonResponse({
         'charts_data': charts_data,
-        'total_responses': responses.count(),
+        'total_responses': total_responses,
     })
+    response['ETag'] = f'"{version}"'
+    response['Cache-Control'] = 'no-store'
+    return response
 
 
 @login_required
@@ -1395,20 +1493,20 @@ def overall_analytics(request):
     
     # Get all surveys and responses
     total_surveys = Survey.objects.filter(teacher=teacher).count()
-    total_responses = StudentResponse.objects.filter(
-        survey__teacher=teacher,
-        is_submitted=True
-    ).count()
+    response_counts = AnswerCount.objects.filter(question__isnull=True)
+    total_responses = response_counts.filter(
+        survey__teacher=teacher
+    ).aggregate(total=Sum('count'))['total'] or 0
     
     # Get surveys with their response counts
     surveys = Survey.objects.filter(teacher=teacher).annotate(
-        response_count=Count('responses', filter=Q(responses__is_submitted=True))
-    ).order_by('-created_at')
+        response_count=Coalesce(
+            Subquery(response_counts.filter(survey=OuterRef('pk')).values('count')[:1]),
+            0,
+        )
+    )
     
-    # Paginate surveys
-    paginator = Paginator(surveys, 10)  # 10 surveys per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = _keyset_page(request, surveys, ['created_at', 'id'], ANALYTICS_SURVEYS_PER_PAGE)
     
     context = {
         'total_surveys': total_surveys,
@@ -1419,6 +1517,14 @@ def overall_analytics(request):
     return render(request, 'overall_analytics.html', context)
 
 
+@login_required
+def request_metrics(request):
+    """Rolling query-count and latency percentiles per view, for staff"""
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'message': 'Unauthorized'}, status=403)
+    return JsonResponse({'success': True, 'window': METRICS_WINDOW, 'views': metrics_snapshot()})
+
+
 @login_required
 def profile_page(request):
     """View and edit user profile"""
@@ -50,6 +50,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'WebSurvey.middleware.RequestMetricsMiddleware',
     'WebSurvey.middleware.AutoCloseSurveyMiddleware',
 ]
 
@@ -122,6 +123,16 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Validated student CSVs, plain-text passwords included, wait here for the job
+# worker instead of in the database. Files are owner-only, outside MEDIA_ROOT,
+# and deleted when the worker reads them or after IMPORT_STAGING_TIMEOUT seconds.
+IMPORT_STAGING_ROOT = BASE_DIR / 'import_staging'
+IMPORT_STAGING_TIMEOUT = 60 * 60
+
+# Uploaded files (content-addressed context images live under MEDIA_ROOT/blobs)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -144,3 +155,48 @@ MESSAGE_TAGS = {
     messages.WARNING: 'warning',
     messages.ERROR: 'danger',  # Bootstrap uses 'danger' instead of 'error'
 }
+
+# Cache used for the survey auto-close due-date watermark.
+# Swap for a shared backend (e.g. Redis/Memcached) when running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'websurvey-default',
+        # Room for survey snapshots and per-question fragments of large quizzes
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
+# Seconds between the analytics page's refresh requests. An unchanged survey
+# is answered with an immediate 304, so each idle request is a few queries.
+ANALYTICS_POLL_INTERVAL = 5
+
+# Seconds a rendered question block of student_take_survey.html is cached.
+# Blocks are keyed by question id and survey revision, so edits never serve
+# stale markup; this only bounds how long unused fragments linger.
+TAKE_SURVEY_FRAGMENT_TIMEOUT = 60 * 60
+
+# Most SQL queries a view should run per request (keyed by URL name, or by
+# URL name then HTTP method); RequestMetricsMiddleware logs a warning when one
+# goes over. Views not listed fall back to DEFAULT_QUERY_BUDGET (None disables
+# the check). The figures sit a little above the counts WebSurvey/tests.py
+# measures with cold caches: writes on a 500-question survey take a few more
+# statements because SQLite caps the parameters of each bulk INSERT/UPDATE.
+# Rolling per-view percentiles are served to staff at /metrics/requests/.
+QUERY_BUDGETS = {
+    'dashboard': 10,
+    'take_survey': {'GET': 12, 'POST': 40},
+    'save_survey': 32,
+    'duplicate_survey': 28,
+    'get_survey_data': 10,
+    'survey_analytics': 10,
+    'survey_analytics_data': 10,
+    'response_management': 10,
+    'student_available_surveys': 10,
+}
+DEFAULT_QUERY_BUDGET = 30
+
+# Send each response's query count and timings in a Server-Timing header
+# (shown in the browser's network panel). Staff always get it; everyone else
+# only while this is on, so production does not reveal timings to visitors.
+SERVER_TIMING_HEADER = DEBUG
@@ -28,6 +28,9 @@ urlpatterns = [
     path('surveys/<int:survey_id>/edit/', views.survey_builder, name='survey_edit'),
     path('surveys/save/', views.save_survey, name='save_survey'),
     path('surveys/<int:survey_id>/data/', views.get_survey_data, name='get_survey_data'),
+    path('surveys/<int:survey_id>/ops/', views.survey_operations, name='survey_operations'),
+    path('blobs/upload/', views.upload_blob, name='upload_blob'),
+    path('blobs/<str:name>', views.serve_blob, name='blob'),
     path('surveys/<int:survey_id>/delete/', views.delete_survey, name='delete_survey'),
     path('surveys/<int:survey_id>/duplicate/', views.duplicate_survey, name='duplicate_survey'),
     
@@ -36,14 +39,24 @@ urlpatterns = [
     path('sections/create/', views.create_section, name='create_section'),
     path('sections/<int:section_id>/edit/', views.edit_section, name='edit_section'),
     path('sections/<int:section_id>/delete/', views.delete_section, name='delete_section'),
+    path('sections/<int:section_id>/import-students/', views.import_section_students, name='import_section_students'),
+    path('sections/import-jobs/<int:job_id>/', views.import_job_status, name='import_job_status'),
     path('sections/<int:section_id>/remove-student/<int:user_id>/', views.remove_student_from_section, name='remove_student_from_section'),
 
     # Response Management URLs (Teacher only)
     path('responses/', views.response_management, name='response_management'),
     path('responses/<int:pk>/', views.response_detail, name='response_detail'),
+    path('responses/export/', views.export_responses, name='export_responses'),
+    path('surveys/<int:survey_id>/export/', views.export_survey_responses, name='export_survey_responses'),
+    path('responses/export/jobs/', views.start_export_job, name='start_export_job'),
+    path('responses/export/jobs/<int:job_id>/', views.export_job_status, name='export_job_status'),
+    path('responses/export/jobs/<int:job_id>/download/', views.download_export_job, name='download_export_job'),
     
     # Analytics URLs (Teacher only)
     path('analytics/', views.overall_analytics, name='overall_analytics'),
     path('surveys/<int:survey_id>/analytics/', views.survey_analytics, name='survey_analytics'),
     path('surveys/<int:survey_id>/analytics/data/', views.survey_analytics_data, name='survey_analytics_data'),
+
+    # Request instrumentation (staff only)
+    path('metrics/requests/', views.request_metrics, name='request_metrics'),
 ]
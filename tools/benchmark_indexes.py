@@ -0,0 +1,191 @@
+"""
+Benchmark the hot query shapes with and without the 0011_hot_path_indexes migration.
+
+Seeds a throwaway test database (the real db.sqlite3 is never touched) with
+about 100k student responses, then prints the query plan and median timing of
+each query before and after the indexes are applied.
+
+Run this with: python tools/benchmark_indexes.py [--responses 100000] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'aSurveyWeb.settings')
+django.setup()
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from WebSurvey.models import (
+    MultipleChoiceOption,
+    Question,
+    QuestionAnswer,
+    Section,
+    StudentResponse,
+    Survey,
+    User,
+)
+
+BEFORE_MIGRATION = '0010_externalize_context_images'
+AFTER_MIGRATION = '0011_hot_path_indexes'
+SURVEYS_PER_TEACHER = 20
+BATCH_SIZE = 5000
+
+
+def seed(total_responses):
+    """Create teachers, surveys and students so every student answers every survey of their teacher."""
+    rng = random.Random(42)
+    now = timezone.now()
+    teacher_count = max(1, total_responses // (SURVEYS_PER_TEACHER * 250))
+    students_per_teacher = total_responses // (teacher_count * SURVEYS_PER_TEACHER)
+
+    teachers = User.objects.bulk_create([
+        User(username=f'bench_teacher_{i}', role='teacher', password='!') for i in range(teacher_count)
+    ])
+    sections = Section.objects.bulk_create([
+        Section(name=f'Bench Section {i}', teacher=teacher) for i, teacher in enumerate(teachers)
+    ])
+    surveys = Survey.objects.bulk_create([
+        Survey(
+            title=f'Bench Survey {t}-{i}',
+            teacher=teacher,
+            status=rng.choice(['published', 'closed']),
+            due_date=now + timedelta(days=rng.randint(-30, 30)),
+        )
+        for t, teacher in enumerate(teachers)
+        for i in range(SURVEYS_PER_TEACHER)
+    ])
+    questions = Question.objects.bulk_create([
+        Question(survey=survey, question_type='multiple_choice', question_text='Pick one', order=0)
+        for survey in surveys
+    ])
+    options = MultipleChoiceOption.objects.bulk_create([
+        MultipleChoiceOption(question=question, option_text=f'Option {j}', order=j)
+        for question in questions
+        for j in range(4)
+    ])
+    options_by_question = {}
+    for option in options:
+        options_by_question.setdefault(option.question_id, []).append(option)
+
+    students = User.objects.bulk_create([
+        User(username=f'bench_student_{t}_{i}', role='student', password='!', section=section)
+        for t, section in enumerate(sections)
+        for i in range(students_per_teacher)
+    ], batch_size=BATCH_SIZE)
+
+    responses = []
+    for survey in surveys:
+        teacher_index = teachers.index(survey.teacher)
+        first = teacher_index * students_per_teacher
+        for student in students[first:first + students_per_teacher]:
+            submitted = rng.random() < 0.9
+            responses.append(StudentResponse(
+                survey=survey,
+                student=student,
+                is_submitted=submitted,
+                submitted_at=now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)) if submitted else None,
+            ))
+    responses = StudentResponse.objects.bulk_create(responses, batch_size=BATCH_SIZE)
+
+    question_by_survey = {question.survey_id: question for question in questions}
+    QuestionAnswer.objects.bulk_create([
+        QuestionAnswer(
+            response=response,
+            question=question_by_survey[response.survey_id],
+            selected_option=rng.choice(options_by_question[question_by_survey[response.survey_id].id]),
+        )
+        for response in responses
+    ], batch_size=BATCH_SIZE)
+    return teachers[0], students[0], surveys[0], questions[0]
+
+
+def hot_queries(teacher, student, survey, question):
+    now = timezone.now()
+    return [
+        ('response_management page', lambda: StudentResponse.objects.filter(
+            survey__teacher=teacher, is_submitted=True
+        ).select_related('student', 'survey').order_by('-submitted_at', '-id')[:10]),
+        ('submitted responses of a survey', lambda: StudentResponse.objects.filter(
+            survey=survey, is_submitted=True
+        ).values('id')),
+        ('submitted responses of a student', lambda: StudentResponse.objects.filter(
+            student=student, is_submitted=True
+        ).values('id')),
+        ('option tally of a question', lambda: QuestionAnswer.objects.filter(
+            question=question
+        ).values('selected_option').annotate(total=Count('id')).order_by()),
+        ('auto-close sweep', lambda: Survey.objects.filter(
+            status='published', due_date__lte=now
+        ).values('id')),
+        ('next due date watermark', lambda: Survey.objects.filter(
+            status='published', due_date__isnull=False
+        ).values('status').annotate(next_due=Min('due_date')).order_by()),
+        ('teacher survey list', lambda: Survey.objects.filter(teacher=teacher).order_by('-created_at')[:10]),
+    ]
+
+
+def run(label, queries, repeat):
+    print(f'\n=== {label} ===')
+    results = {}
+    for name, build in queries:
+        plan = build().explain()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(build())
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = statistics.median(timings)
+        print(f'\n-- {name}: {results[name]:.2f} ms (median of {repeat})')
+        for line in plan.splitlines():
+            print(f'   {line}')
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--responses', type=int, default=100_000, help='Number of student responses to seed.')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query.')
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        call_command('migrate', 'WebSurvey', BEFORE_MIGRATION, verbosity=0)
+        print(f'Seeding {args.responses} responses...')
+        start = time.perf_counter()
+        fixtures = seed(args.responses)
+        print(f'Seeded in {time.perf_counter() - start:.1f}s')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        queries = hot_queries(*fixtures)
+        before = run(f'Before ({BEFORE_MIGRATION})', queries, args.repeat)
+        call_command('migrate', 'WebSurvey', AFTER_MIGRATION, verbosity=0)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        after = run(f'After ({AFTER_MIGRATION})', queries, args.repeat)
+
+        print('\n=== Summary (median ms) ===')
+        print(f'{"query":<36}{"before":>10}{"after":>10}{"speedup":>10}')
+        for name, _ in queries:
+            speedup = before[name] / after[name] if after[name] else float('inf')
+            print(f'{name:<36}{before[name]:>10.2f}{after[name]:>10.2f}{speedup:>9.1f}x')
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+"""
+Simulate a class taking a survey and report per-endpoint latency and query counts.
+
+Seeds a throwaway test database (the real db.sqlite3 is never touched) with a
+teacher, a section of students and a published survey, then runs the class
+through it with Django's test Client, one thread per concurrent student:
+
+  1. every student logs in through the login view,
+  2. every student opens take_survey at the same time,
+  3. every student saves a few drafts, answering a few more questions each time,
+  4. every student submits as the deadline passes: the due date is moved to
+     --close-after seconds into this phase, so later submissions run into the
+     auto-close path and are turned away,
+
+while the teacher keeps survey_analytics open and polls its data endpoint
+with If-None-Match every --poll-interval seconds, as the page does. Each
+endpoint's throughput, p50/p95/p99 latency and query counts are printed at
+the end; polls answered 304 (nothing changed) are listed separately.
+
+Runs against SQLite by default. Pass --postgres to use a local PostgreSQL
+server instead (connection settings default to the usual PG* environment
+variables); the test database is created next to --db-name and dropped after.
+
+Run this with: python tools/load_test.py [--students 200] [--concurrency 50] [--questions 20] [--drafts 2]
+                                        [--close-after 2] [--poll-interval 5]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'aSurveyWeb.settings')
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from WebSurvey.instrumentation import QueryTimer
+from WebSurvey.models import (
+    EnumerationAnswer,
+    MultipleChoiceOption,
+    Question,
+    Section,
+    StudentResponse,
+    Survey,
+    TrueFalseAnswer,
+    User,
+)
+
+QUESTION_TYPES = ['multiple_choice', 'true_false', 'essay', 'enumeration', 'likert']
+PASSWORD = 'load-test-password'
+PERCENTILES = (50, 95, 99)
+BATCH_SIZE = 5000
+# The analytics page waits this long after a failed data request
+ANALYTICS_ERROR_BACKOFF = 5
+
+
+def configure_database(args):
+    """Point the default database at PostgreSQL or at an on-disk SQLite test file.
+
+    Runs before the first connection is opened, so updating the settings dict
+    in place is enough. SQLite's default in-memory test database is replaced
+    by a file because every simulated student uses its own connection.
+    """
+    database = settings.DATABASES['default']
+    if args.postgres:
+        database.update({
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': args.db_name,
+            'USER': args.db_user,
+            'PASSWORD': args.db_password,
+            'HOST': args.db_host,
+            'PORT': args.db_port,
+            'OPTIONS': {},
+        })
+        return None
+    path = os.path.join(tempfile.mkdtemp(prefix='load_test_'), 'load_test.sqlite3')
+    database['TEST']['NAME'] = path
+    # Wait for the write lock instead of failing, and take it up front in atomic blocks
+    database['OPTIONS'].update({'timeout': 30, 'transaction_mode': 'IMMEDIATE'})
+    return path
+
+
+def seed(student_count, question_count):
+    """Create the teacher, a section of students and a published survey assigned to it."""
+    password_hash = make_password(PASSWORD)
+    teacher = User.objects.create(username='load_teacher', role='teacher', password=password_hash)
+    section = Section.objects.create(name='Load Test Section', teacher=teacher)
+    students = User.objects.bulk_create([
+        User(username=f'load_student_{i}', role='student', password=password_hash, section=section)
+        for i in range(student_count)
+    ], batch_size=BATCH_SIZE)
+
+    survey = Survey.objects.create(
+        title='Load Test Survey',
+        teacher=teacher,
+        status='published',
+        due_date=timezone.now() + timedelta(days=1),
+    )
+    survey.sections.add(section)
+    questions = Question.objects.bulk_create([
+        Question(
+            survey=survey,
+            question_type=QUESTION_TYPES[i % len(QUESTION_TYPES)],
+            question_text=f'Question {i}',
+            order=i,
+        )
+        for i in range(question_count)
+    ])
+    options = MultipleChoiceOption.objects.bulk_create([
+        MultipleChoiceOption(question=question, option_text=f'Option {order}', order=order, is_correct=order == 0)
+        for question in questions
+        if question.question_type in ('multiple_choice', 'likert')
+        for order in range(4)
+    ])
+    TrueFalseAnswer.objects.bulk_create([
+        TrueFalseAnswer(question=question, is_true=True)
+        for question in questions
+        if question.question_type == 'true_false'
+    ])
+    EnumerationAnswer.objects.bulk_create([
+        EnumerationAnswer(question=question, answer_text=f'Answer {order}', order=order)
+        for question in questions
+        if question.question_type == 'enumeration'
+        for order in range(2)
+    ])
+    return teacher, students, survey, questions, options
+
+
+def answer_fields(questions, options):
+    """take_survey form fields answering every question, in question order."""
+    first_option = {}
+    for option in options:
+        first_option.setdefault(option.question_id, option.id)
+    fields = []
+    for question in questions:
+        if question.question_type in ('multiple_choice', 'likert'):
+            value = str(first_option[question.id])
+        elif question.question_type == 'true_false':
+            value = 'true'
+        else:
+            value = 'an answer'
+        fields.append((f'question_{question.id}', value))
+    return fields
+
+
+class Recorder:
+    """Thread-safe collection of ``(latency_ms, queries, ok)`` samples per endpoint."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.windows = {}
+        self._lock = threading.Lock()
+
+    def request(self, endpoint, send):
+        """Run ``send()`` on this thread's connection, record how it went and return the response.
+
+        A request counts as failed when the view raises (then None is
+        returned) or answers 4xx/5xx; a 304 is recorded under
+        ``'<endpoint> (304)'``. The connection is closed afterwards, as the
+        request_finished signal does on a real server with the default
+        ``CONN_MAX_AGE``.
+        """
+        timer = QueryTimer()
+        start = time.perf_counter()
+        response = None
+        try:
+            with connection.execute_wrapper(timer):
+                response = send()
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            ok = response.status_code < 400
+            if response.status_code == 304:
+                endpoint = f'{endpoint} (304)'
+        except Exception as e:
+            print(f'   {endpoint} failed: {e}')
+            ok = False
+        latency_ms = (time.perf_counter() - start) * 1000
+        connection.close()
+        with self._lock:
+            self.samples[endpoint].append((latency_ms, timer.count, ok))
+        return response if ok else None
+
+    def phase(self, endpoint, started, finished):
+        """Remember the wall-clock window ``endpoint`` ran in, for its throughput."""
+        self.windows[endpoint] = finished - started
+
+
+def _percentiles(values):
+    ordered = sorted(values)
+    # Nearest-rank percentile
+    return [ordered[max(0, -(-percentile * len(ordered) // 100) - 1)] for percentile in PERCENTILES]
+
+
+def report(recorder):
+    print('\n=== Results ===')
+    header = f'{"endpoint":<28}{"requests":>9}{"errors":>8}{"req/s":>9}'
+    header += ''.join(f'{f"p{p} ms":>10}' for p in PERCENTILES)
+    header += ''.join(f'{f"p{p} q":>8}' for p in PERCENTILES)
+    print(header)
+    for endpoint, samples in recorder.samples.items():
+        latencies, queries, ok = zip(*samples)
+        window = recorder.windows.get(endpoint) or 0
+        throughput = f'{len(samples) / window:.1f}' if window else '-'
+        line = f'{endpoint:<28}{len(samples):>9}{ok.count(False):>8}{throughput:>9}'
+        line += ''.join(f'{value:>10.1f}' for value in _percentiles(latencies))
+        line += ''.join(f'{value:>8}' for value in _percentiles(queries))
+        print(line)
+
+
+def run_phase(pool, recorder, endpoint, clients, send):
+    """Send one ``endpoint`` request per student, ``pool`` workers at a time."""
+    print(f'-- {endpoint}: {len(clients)} students')
+    started = time.perf_counter()
+    list(pool.map(lambda client: recorder.request(endpoint, lambda: send(client)), clients))
+    recorder.phase(endpoint, started, time.perf_counter())
+
+
+def watch_analytics(recorder, teacher, survey, interval, stop):
+    """Keep the teacher's analytics page open: load it once, then poll its data endpoint.
+
+    Like the page's script, each request sends the ETag it last saw in
+    If-None-Match, so unchanged analytics are answered 304 straight away.
+    """
+    client = Client()
+    client.force_login(teacher)
+    connection.close()
+    started = time.perf_counter()
+    try:
+        page = recorder.request('survey_analytics', lambda: client.get(reverse('survey_analytics', args=[survey.id])))
+        etag = f'"{page.context["analytics_version"]}"' if page is not None else ''
+        data_url = reverse('survey_analytics_data', args=[survey.id])
+        while not stop.wait(interval):
+            response = recorder.request(
+                'survey_analytics_data', lambda: client.get(data_url, headers={'If-None-Match': etag})
+            )
+            if response is None:
+                stop.wait(ANALYTICS_ERROR_BACKOFF)
+            elif response.status_code == 200:
+                etag = response['ETag']
+    finally:
+        finished = time.perf_counter()
+        recorder.phase('survey_analytics_data', started, finished)
+        recorder.phase('survey_analytics_data (304)', started, finished)
+
+
+def close_survey_after(survey, seconds):
+    """Move the survey's due date ``seconds`` from now; requests after that auto-close it."""
+    survey.due_date = timezone.now() + timedelta(seconds=seconds)
+    # A save (not an update) resets the cached next-due watermark through post_save
+    survey.save(update_fields=['due_date'])
+    connection.close()
+
+
+def simulate(args, teacher, students, survey, fields):
+    recorder = Recorder()
+    clients = [Client() for _ in students]
+    take_url = reverse('take_survey', args=[survey.id])
+    login_url = reverse('login')
+
+    stop = threading.Event()
+    watcher = threading.Thread(
+        target=watch_analytics, args=(recorder, teacher, survey, args.poll_interval, stop), daemon=True
+    )
+    watcher.start()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            run_phase(pool, recorder, 'login', list(zip(clients, students)), lambda pair: pair[0].post(
+                login_url,
+                {'username': pair[1].username, 'password': PASSWORD},
+                headers={'X-Requested-With': 'XMLHttpRequest'},
+            ))
+            run_phase(pool, recorder, 'take_survey (open)', clients, lambda client: client.get(take_url))
+            for draft in range(1, args.drafts + 1):
+                answered = dict(fields[:len(fields) * draft // (args.drafts + 1)])
+                run_phase(pool, recorder, 'take_survey (draft)', clients, lambda client: client.post(
+                    take_url, {'action': 'draft', **answered}
+                ))
+            close_survey_after(survey, args.close_after)
+            run_phase(pool, recorder, 'take_survey (submit)', clients, lambda client: client.post(
+                take_url, {'action': 'submit', **dict(fields)}
+            ))
+    finally:
+        stop.set()
+        watcher.join()
+    return recorder
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=200, help='Number of students in the class.')
+    parser.add_argument('--concurrency', type=int, default=50, help='Students sending requests at the same time.')
+    parser.add_argument('--questions', type=int, default=20, help='Number of questions in the survey.')
+    parser.add_argument('--drafts', type=int, default=2, help='Drafts each student saves before submitting.')
+    parser.add_argument(
+        '--close-after', type=float, default=2.0,
+        help='Seconds into the submit phase at which the survey falls due and is auto-closed.',
+    )
+    parser.add_argument(
+        '--poll-interval', type=float, default=settings.ANALYTICS_POLL_INTERVAL,
+        help='Seconds between analytics refreshes (the page uses ANALYTICS_POLL_INTERVAL).',
+    )
+    parser.add_argument('--postgres', action='store_true', help='Run against a local PostgreSQL server.')
+    parser.add_argument('--db-name', default=os.environ.get('PGDATABASE', 'asurveyweb'))
+    parser.add_argument('--db-user', default=os.environ.get('PGUSER', 'postgres'))
+    parser.add_argument('--db-password', default=os.environ.get('PGPASSWORD', ''))
+    parser.add_argument('--db-host', default=os.environ.get('PGHOST', 'localhost'))
+    parser.add_argument('--db-port', default=os.environ.get('PGPORT', '5432'))
+    args = parser.parse_args()
+
+    sqlite_path = configure_database(args)
+    # The report already shows query counts; skip the per-request budget warnings
+    logging.getLogger('WebSurvey.middleware').setLevel(logging.ERROR)
+    # Lets the test Client accept the 'testserver' host
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        print(f'Database: {connection.vendor} ({connection.settings_dict["NAME"]})')
+        teacher, students, survey, questions, options = seed(args.students, args.questions)
+        print(f'Seeded {args.students} students and a {args.questions}-question survey')
+        recorder = simulate(args, teacher, students, survey, answer_fields(questions, options))
+        report(recorder)
+        survey.refresh_from_db()
+        submitted = StudentResponse.objects.filter(survey=survey, is_submitted=True).count()
+        print(f'\n{submitted} of {args.students} submissions landed before the survey closed (status: {survey.status})')
+    finally:
+        connection.close()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if sqlite_path:
+            os.rmdir(os.path.dirname(sqlite_path))
+
+
+if __name__ == '__main__':
+    main()